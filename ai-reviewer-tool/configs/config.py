@@ -166,7 +166,7 @@ class Config:
         
         # Performance Configuration
         self.max_parallel_files = int(os.getenv('MAX_PARALLEL_FILES', '5'))
-        self.cache_enabled = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+        self.cache_enabled = os.getenv('CACHE_ENABLED', 'false').lower() == 'true'
         self.cache_dir = os.getenv('CACHE_DIR', './cache')
     
     def _load_config_file(self, config_file: str):
@@ -13,11 +13,22 @@ from typing import Dict, List, Optional, Any
 import logging
 import json
 import os
-import re
+from collections import Counter
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .llm_provider import create_llm_provider
+from .code_blocks import extract_first_code_block
 
 logger = logging.getLogger(__name__)
 
+# orjson's JSONDecodeError subclasses json.JSONDecodeError, so the handler below still applies
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
 
 class CodeReviewAgents:
     """AI agents for comprehensive code review."""
@@ -324,9 +335,10 @@ class CodeReviewAgents:
             })
         
         # Calculate metrics based on issues
-        security_issues = len([i for i in issues if i['type'] == 'security'])
-        performance_issues = len([i for i in issues if i['type'] == 'performance'])
-        maintainability_issues = len([i for i in issues if i['type'] == 'maintainability'])
+        type_counts = Counter(i['type'] for i in issues)
+        security_issues = type_counts['security']
+        performance_issues = type_counts['performance']
+        maintainability_issues = type_counts['maintainability']
         
         metrics = {
             'complexity_score': min(10, len(lines) // 5),
@@ -522,7 +534,7 @@ class CodeReviewAgents:
             
             if json_start != -1 and json_end > json_start:
                 json_str = result[json_start:json_end]
-                parsed_result = json.loads(json_str)
+                parsed_result = _json_loads(json_str)
                 
                 # Ensure all required fields are present
                 return {
@@ -572,20 +584,10 @@ class CodeReviewAgents:
     
     def _extract_improved_code(self, result: str) -> str:
         """Extract improved code from agent result."""
-        # Look for code blocks in the result
-        code_block_patterns = [
-            r'```(?:python|javascript|java|cpp|csharp|php|ruby|go|rust|swift|kotlin|scala|html|css|sql|bash|powershell)?\n(.*?)\n```',
-            r'```\n(.*?)\n```',
-            r'```(.*?)```'
-        ]
-        
-        for pattern in code_block_patterns:
-            matches = re.findall(pattern, result, re.DOTALL)
-            if matches:
-                return matches[0].strip()
+        improved_code = extract_first_code_block(result)
         
         # If no code blocks found, return the entire result
-        return result.strip()
+        return improved_code if improved_code is not None else result.strip()
 
 
 def setup_agents(llm_config: Dict[str, Any]) -> CodeReviewAgents:
@@ -45,7 +45,7 @@ if __name__ == '__main__':
     from src.ingestion import ingest_frd, ingest_codebase, CodebaseIngestionError
     from src.prompts import get_review_prompt, get_improvement_prompt, get_summary_prompt
     from src.agents import setup_agents, run_review
-    from src.tools import analyze_code, improve_code, analyze_security, analyze_performance, improve_documentation
+    from src.tools import improve_code, improve_documentation, analyze_all
     from src.output import generate_output, generate_report, generate_project_summary, check_output_completeness
     from src.logger import setup_logger, get_logger
 else:
@@ -55,7 +55,7 @@ else:
     from .ingestion import ingest_frd, ingest_codebase, CodebaseIngestionError
     from .prompts import get_review_prompt, get_improvement_prompt, get_summary_prompt
     from .agents import setup_agents, run_review
-    from .tools import analyze_code, improve_code, analyze_security, analyze_performance, improve_documentation
+    from .tools import improve_code, improve_documentation, analyze_all
     from .output import generate_output, generate_report, generate_project_summary, check_output_completeness
     from .logger import setup_logger, get_logger
 
@@ -529,38 +529,30 @@ def process_codebase(
         logger.info(f"Processing file {i}/{total_files}: {file_info['name']}")
         
         try:
-            # Analyze code
-            logger.debug(f"Calling analyze_code for {file_info['name']}")
-            analysis_result = analyze_code.invoke({
-                'code': file_info['content'],
-                'file_path': file_info['path']
-            })
+            # Code, security and performance analyses are independent; run them concurrently
+            logger.debug(f"Calling analyze_all for {file_info['name']}")
+            analyses = analyze_all(
+                file_info['content'],
+                file_info['path'],
+                security=(focus in ['security', 'all']) and enable_security,
+                performance=(focus in ['performance', 'all']) and enable_performance
+            )
+            
+            analysis_result = analyses['analysis']
             logger.debug(f"analyze_code result type: {type(analysis_result)}")
             if not isinstance(analysis_result, dict):
                 logger.warning(f"analysis_result is not a dict: {type(analysis_result)}")
                 analysis_result = {}
             
-            # Security analysis if needed
-            security_result = None
-            if (focus in ['security', 'all']) and enable_security:
-                logger.debug(f"Calling analyze_security for {file_info['name']}")
-                security_result = analyze_security.invoke({
-                    'code': file_info['content'],
-                    'file_path': file_info['path']
-                })
+            security_result = analyses['security']
+            if security_result is not None:
                 logger.debug(f"analyze_security result type: {type(security_result)}, value: {security_result}")
                 if not isinstance(security_result, dict):
                     logger.warning(f"security_result is not a dict: {type(security_result)}")
                     security_result = {}
             
-            # Performance analysis if needed
-            performance_result = None
-            if (focus in ['performance', 'all']) and enable_performance:
-                logger.debug(f"Calling analyze_performance for {file_info['name']}")
-                performance_result = analyze_performance.invoke({
-                    'code': file_info['content'],
-                    'file_path': file_info['path']
-                })
+            performance_result = analyses['performance']
+            if performance_result is not None:
                 logger.debug(f"analyze_performance result type: {type(performance_result)}, value: {performance_result}")
                 if not isinstance(performance_result, dict):
                     logger.warning(f"performance_result is not a dict: {type(performance_result)}")
@@ -642,33 +634,25 @@ def analyze_codebase_only(
     
     for file_info in files:
         try:
-            # Analyze code
-            analysis_result = analyze_code.invoke({
-                'code': file_info['content'],
-                'file_path': file_info['path']
-            })
+            # Code, security and performance analyses are independent; run them concurrently
+            analyses = analyze_all(
+                file_info['content'],
+                file_info['path'],
+                security=(focus in ['security', 'all']) and enable_security,
+                performance=(focus in ['performance', 'all']) and enable_performance
+            )
+            
+            analysis_result = analyses['analysis']
             if not isinstance(analysis_result, dict):
                 analysis_result = {}
             
-            # Security analysis if needed
-            security_result = None
-            if (focus in ['security', 'all']) and enable_security:
-                security_result = analyze_security.invoke({
-                    'code': file_info['content'],
-                    'file_path': file_info['path']
-                })
-                if not isinstance(security_result, dict):
-                    security_result = {}
+            security_result = analyses['security']
+            if security_result is not None and not isinstance(security_result, dict):
+                security_result = {}
             
-            # Performance analysis if needed
-            performance_result = None
-            if (focus in ['performance', 'all']) and enable_performance:
-                performance_result = analyze_performance.invoke({
-                    'code': file_info['content'],
-                    'file_path': file_info['path']
-                })
-                if not isinstance(performance_result, dict):
-                    performance_result = {}
+            performance_result = analyses['performance']
+            if performance_result is not None and not isinstance(performance_result, dict):
+                performance_result = {}
             
             result = {
                 'file_info': file_info,
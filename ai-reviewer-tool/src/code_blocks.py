@@ -0,0 +1,34 @@
+"""
+Fenced code block extraction for LLM and agent responses.
+
+Shared by the tools and agents modules. It has no import-time side
+effects, so importing it does not pull in either of them.
+"""
+
+import re
+from typing import Optional
+
+
+# Fenced code block patterns, most specific first
+CODE_BLOCK_PATTERNS = tuple(re.compile(pattern, re.DOTALL) for pattern in (
+    r'```(?:python|javascript|java|cpp|csharp|php|ruby|go|rust|swift|kotlin|scala|html|css|sql|bash|powershell)?\n(.*?)\n```',
+    r'```\n(.*?)\n```',
+    r'```(.*?)```'
+))
+
+
+def extract_first_code_block(text: str) -> Optional[str]:
+    """
+    Return the stripped contents of the first fenced code block in text.
+
+    Args:
+        text: Response text that may contain Markdown code fences
+
+    Returns:
+        Code block contents, or None if the text has no code block
+    """
+    for pattern in CODE_BLOCK_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+    return None
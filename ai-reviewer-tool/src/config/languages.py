@@ -5,6 +5,7 @@ This module provides a single source of truth for language detection
 and file extension mapping used throughout the application.
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Set
 import os
@@ -44,10 +45,13 @@ DEFAULT_IGNORE_PATTERNS = {
 }
 
 
+@lru_cache(maxsize=1024)
 def get_language_from_extension(file_path: str) -> str:
     """
     Get programming language from file extension.
     
+    Results are cached per path, since every tool call for a file asks again.
+    
     Args:
         file_path: Path to the file
         
@@ -12,7 +12,7 @@ import tempfile
 import shutil
 import os
 import re
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, BinaryIO
 from pathlib import Path
 import logging
 import git
@@ -20,6 +20,8 @@ from urllib.parse import urlparse
 import requests
 
 from .config.languages import get_language_from_extension, get_supported_extensions, get_ignore_patterns
+from .exceptions import ValidationError
+from .validation import validator
 
 logger = logging.getLogger(__name__)
 
@@ -63,12 +65,13 @@ def ingest_frd(frd_path: str) -> Dict[str, str]:
         raise CodebaseIngestionError(f"Failed to ingest FRD: {e}")
 
 
-def ingest_codebase(codebase_path: str, output_dir: str = None) -> Dict[str, Any]:
+def ingest_codebase(codebase_path: Union[str, BinaryIO], output_dir: str = None) -> Dict[str, Any]:
     """
     Ingests codebase from various formats.
     
     Args:
-        codebase_path: Path to codebase (file, ZIP, Git repo, or directory).
+        codebase_path: Path to codebase (file, ZIP, Git repo, or directory),
+            or a binary file-like object holding a ZIP archive.
         output_dir: Directory to extract codebase to (optional).
         
     Returns:
@@ -79,7 +82,12 @@ def ingest_codebase(codebase_path: str, output_dir: str = None) -> Dict[str, Any
     """
     try:
         # Determine input type and process accordingly
-        if _is_git_repository(codebase_path):
+        if not isinstance(codebase_path, str):
+            # In-memory archives are recognised by their magic bytes, not an extension
+            if zipfile.is_zipfile(codebase_path):
+                return _ingest_zip_file(codebase_path, output_dir)
+            raise CodebaseIngestionError("Unsupported codebase format: file object is not a ZIP archive")
+        elif _is_git_repository(codebase_path):
             return _ingest_git_repository(codebase_path, output_dir)
         elif _is_zip_file(codebase_path):
             return _ingest_zip_file(codebase_path, output_dir)
@@ -170,8 +178,8 @@ def _ingest_git_repository(repo_path: str, output_dir: str = None) -> Dict[str,
         raise CodebaseIngestionError(f"Failed to ingest Git repository: {e}")
 
 
-def _ingest_zip_file(zip_path: str, output_dir: str = None) -> Dict[str, Any]:
-    """Ingest code from a ZIP file."""
+def _ingest_zip_file(zip_path: Union[str, BinaryIO], output_dir: str = None) -> Dict[str, Any]:
+    """Ingest code from a ZIP file path or binary file-like object."""
     try:
         if output_dir is None:
             output_dir = tempfile.mkdtemp(prefix="zip_extract_")
@@ -180,7 +188,11 @@ def _ingest_zip_file(zip_path: str, output_dir: str = None) -> Dict[str, Any]:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             zip_ref.extractall(output_dir)
         
-        logger.info(f"Extracted ZIP file {zip_path} to {output_dir}")
+        # File objects are reported by name (e.g. an open file), or None for in-memory buffers
+        if not isinstance(zip_path, str):
+            zip_path = getattr(zip_path, 'name', None)
+        
+        logger.info(f"Extracted ZIP file {zip_path or '<in-memory>'} to {output_dir}")
         
         # Extract all code files
         files = _extract_code_files(output_dir)
@@ -288,14 +300,15 @@ def _extract_code_files(directory: str) -> List[Dict[str, Any]]:
             # Check if it's a code file
             if Path(filename).suffix.lower() in code_extensions:
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Check file size limit
-                    if len(content) > max_file_size:
+                    # Check file size limits before reading, so oversized
+                    # files are never loaded; one stat serves both limits
+                    if validator.validate_file_size(file_path) > max_file_size:
                         logger.warning(f"File {file_path} exceeds size limit, skipping")
                         continue
                     
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    
                     files.append({
                         'path': file_path,
                         'relative_path': relative_path,
@@ -304,6 +317,8 @@ def _extract_code_files(directory: str) -> List[Dict[str, Any]]:
                         'size': len(content),
                         'language': get_language_from_extension(filename)
                     })
+                except ValidationError as e:
+                    logger.warning(f"Skipping {file_path}: {e}")
                 except UnicodeDecodeError:
                     logger.warning(f"Could not read file as text: {file_path}")
                 except Exception as e:
@@ -5,7 +5,8 @@ Handles HuggingFace, Google Gemini, OpenAI, and Groq with robust error handling
 
 import os
 import logging
-from typing import Optional, Dict, Any, Union
+import threading
+from typing import Optional, Dict, Any, Iterator, Union
 from pathlib import Path
 
 # Load environment variables from .env file
@@ -46,8 +47,103 @@ try:
 except ImportError:
     HF_API_AVAILABLE = False
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# One httpx client for the OpenAI and Groq chat models, so every model and
+# provider instance shares its connection pool and open TLS sessions
+_http_client: Optional["httpx.Client"] = None
+_http_client_lock = threading.Lock()
+
+# At most one request per worker of the tools module's pools (8 chunk
+# workers + 3 file-analysis workers) is in flight, so a pool of that size
+# keeps every connection reusable instead of httpx's 100/20 defaults
+_HTTP_POOL_SIZE = 8 + 3
+
+
+def _get_shared_http_client() -> Optional["httpx.Client"]:
+    """Return the process-wide httpx client, or None if httpx is not installed."""
+    global _http_client
+    if not HTTPX_AVAILABLE:
+        return None
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=httpx.Limits(
+                    max_connections=_HTTP_POOL_SIZE,
+                    max_keepalive_connections=_HTTP_POOL_SIZE
+                ))
+    return _http_client
+
+
+class JSONObjectScanner:
+    """
+    Incrementally locate the first balanced top-level JSON object in a text.
+    
+    Text is fed in pieces (e.g. streamed LLM chunks). Braces inside JSON
+    strings are ignored, and so are stray closing braces before the object.
+    """
+    
+    __slots__ = ('start', '_offset', '_depth', '_in_string', '_escaped')
+    
+    def __init__(self):
+        self.start = -1  # Offset of the opening brace across all fed text
+        self._offset = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, text: str) -> int:
+        """
+        Scan the next piece of text.
+        
+        Args:
+            text: Next piece of the text
+            
+        Returns:
+            Index in ``text`` just past the object's closing brace, or -1 if
+            the object is not complete yet
+        """
+        depth = self._depth
+        in_string = self._in_string
+        escaped = self._escaped
+        for i, ch in enumerate(text):
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == '\\':
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"' and depth:
+                in_string = True
+            elif ch == '{':
+                if not depth:
+                    self.start = self._offset + i
+                depth += 1
+            elif ch == '}' and depth:
+                depth -= 1
+                if not depth:
+                    self._depth = 0
+                    return i + 1
+        self._depth = depth
+        self._in_string = in_string
+        self._escaped = escaped
+        self._offset += len(text)
+        return -1
+
+
+def extract_first_json(text: str) -> Optional[str]:
+    """Return the first balanced top-level ``{...}`` in ``text``, or None."""
+    scanner = JSONObjectScanner()
+    end = scanner.feed(text)
+    return text[scanner.start:end] if end != -1 else None
+
 
 class LLMProvider:
     """Robust LLM provider with multiple fallback options."""
@@ -98,7 +194,7 @@ class LLMProvider:
             
             api = HfApi(token=api_key)
             # Test with a simple API call
-            models = list(api.list_models(author="bigcode", limit=1))
+            next(iter(api.list_models(author="bigcode", limit=1)), None)
             logger.info("HuggingFace token validated successfully")
             return True
         except Exception as e:
@@ -227,7 +323,8 @@ class LLMProvider:
                     llm = ChatOpenAI(
                         model=model,
                         openai_api_key=api_key,
-                        temperature=self.config.get('temperature', 0.1)
+                        temperature=self.config.get('temperature', 0.1),
+                        http_client=_get_shared_http_client()
                     )
                     
                     # Test the connection with better error handling
@@ -276,7 +373,8 @@ class LLMProvider:
                     llm = ChatGroq(
                         model=model,
                         groq_api_key=api_key,
-                        temperature=self.config.get('temperature', 0.1)
+                        temperature=self.config.get('temperature', 0.1),
+                        http_client=_get_shared_http_client()
                     )
                     
                     # Test the connection with better error handling
@@ -324,35 +422,83 @@ class LLMProvider:
         self.current_provider = "fallback"
         return fallback_llm
     
+    @staticmethod
+    def _response_text(response) -> Union[str, Dict[str, Any]]:
+        """Extract the text from a provider response or stream chunk."""
+        # Handle different response formats
+        if isinstance(response, dict):
+            if 'content' in response:
+                return response['content']
+            elif 'text' in response:
+                return response['text']
+            else:
+                return str(response)
+        elif isinstance(response, str):
+            return response
+        else:
+            # Try to get content from response object
+            if hasattr(response, 'content'):
+                return response.content
+            elif hasattr(response, 'text'):
+                return response.text
+            else:
+                return str(response)
+    
     def invoke(self, prompt: str) -> Union[str, Dict[str, Any]]:
         """Invoke the LLM with a prompt."""
         try:
             response = self.llm.invoke(prompt)
-            
-            # Handle different response formats
-            if isinstance(response, dict):
-                if 'content' in response:
-                    return response['content']
-                elif 'text' in response:
-                    return response['text']
-                else:
-                    return str(response)
-            elif isinstance(response, str):
-                return response
-            else:
-                # Try to get content from response object
-                if hasattr(response, 'content'):
-                    return response.content
-                elif hasattr(response, 'text'):
-                    return response.text
-                else:
-                    return str(response)
+            return self._response_text(response)
                 
         except Exception as e:
             logger.error(f"LLM invocation failed: {e}")
             # Return None to trigger fallback analysis in tools
             return None
     
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response text incrementally, as the provider produces it.
+        
+        Providers without streaming support yield their full response once.
+        """
+        if not hasattr(self.llm, 'stream'):
+            response = self.invoke(prompt)
+            if response is not None:
+                yield response
+            return
+        
+        for chunk in self.llm.stream(prompt):
+            text = self._response_text(chunk)
+            if text:
+                yield text
+    
+    def invoke_json(self, prompt: str) -> Optional[str]:
+        """
+        Stream a response and stop as soon as its first JSON object is complete.
+        
+        Args:
+            prompt: Prompt to send to the LLM
+            
+        Returns:
+            The text received up to the end of the first balanced JSON object
+            (or the whole response if it has none), or None if the call failed,
+            even part-way through the response.
+        """
+        parts = []
+        scanner = JSONObjectScanner()
+        try:
+            for text in self.stream(prompt):
+                parts.append(text)
+                end = scanner.feed(text)
+                if end != -1:
+                    parts[-1] = text[:end]
+                    return ''.join(parts)
+        except Exception as e:
+            # A truncated response must not be parsed as if it were complete
+            logger.error(f"LLM streaming failed: {e}")
+            return None
+        
+        return ''.join(parts) if parts else None
+    
     @property
     def name(self):
         """Get the name of the current LLM provider."""
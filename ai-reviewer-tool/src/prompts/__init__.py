@@ -23,6 +23,7 @@ from .prompts import (
     get_performance_analysis_prompt,
     get_documentation_prompt,
     get_summary_prompt,
+    build_summary_prompt_to,
     _format_requirements,
     _format_issues
 )
@@ -41,6 +42,7 @@ __all__ = [
     'get_performance_analysis_prompt',
     'get_documentation_prompt',
     'get_summary_prompt',
+    'build_summary_prompt_to',
     '_format_requirements',
     '_format_issues'
 ] 
\ No newline at end of file
@@ -6,8 +6,10 @@ using LangChain PromptTemplate.
 """
 
 from langchain.prompts import PromptTemplate
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, TextIO
+import io
 import json
+import string
 
 # --- Prompt System Customization ---
 # You can override any prompt template by setting the environment variable:
@@ -16,21 +18,14 @@ import json
 # See registry.py for details.
 
 # --- Common Prompt Instructions ---
-RETURN_JSON_INSTRUCTION = "Return only valid JSON without any additional text."
-RETURN_JSON_ONLY = "Return only valid JSON."
-
-# --- Legacy vs. Registry Usage ---
-# All new code should use the registry-based prompt system (see registry.py).
-# Legacy functions are provided for backward compatibility but may be deprecated in the future.
-
-def get_review_prompt(requirements: Dict[str, str], code: str, file_path: str = "") -> str:
-    """
-    Generates a prompt for code review.
-    You can override this prompt via PROMPT_TEMPLATE_code_review or configs/prompts/code_review.txt
-    """
-    template = PromptTemplate(
-        input_variables=["reqs", "code", "file_path"],
-        template=f"""
+# Every JSON-returning template ends with exactly this suffix, and every
+# issue schema uses exactly this severity field, so the shared bytes are
+# identical across prompt families (helps provider-side prefix caching).
+RETURN_JSON = "Return only valid JSON."
+_SEVERITY_ENUM = '"severity": "critical|high|medium|low"'
+
+# --- Legacy Template Bodies ---
+_CODE_REVIEW_TEMPLATE = f"""
 You are an expert code reviewer with deep knowledge of software engineering best practices, security, and performance optimization.
 
 REQUIREMENTS TO EVALUATE AGAINST:
@@ -43,25 +38,25 @@ CODE TO REVIEW:
 
 Please perform a comprehensive code review and provide your analysis in the following JSON format:
 
-{{
+{{{{
     "issues": [
-        {{
+        {{{{
             "type": "syntax|security|performance|readability|maintainability|best_practice",
-            "severity": "critical|high|medium|low",
+            {_SEVERITY_ENUM},
             "line": <line_number>,
             "description": "<detailed description of the issue>",
             "suggestion": "<specific suggestion for improvement>"
-        }}
+        }}}}
     ],
     "improved_code": "<complete improved version of the code>",
-    "metrics": {{
+    "metrics": {{{{
         "complexity_score": <1-10>,
         "maintainability_score": <1-10>,
         "security_score": <1-10>,
         "performance_score": <1-10>
-    }},
+    }}}},
     "summary": "<brief summary of key findings and improvements>"
-}}
+}}}}
 
 Focus on:
 1. Syntax errors and bugs
@@ -72,25 +67,10 @@ Focus on:
 6. Resource optimization (memory, CPU, network)
 7. Documentation quality
 
-{RETURN_JSON_INSTRUCTION}
+{RETURN_JSON}
 """
-    )
-    
-    return template.format(
-        reqs=_format_requirements(requirements),
-        code=code,
-        file_path=file_path
-    )
-
 
-def get_improvement_prompt(original_code: str, issues: List[Dict], file_path: str = "") -> str:
-    """
-    Generates a prompt for code improvement based on identified issues.
-    You can override this prompt via PROMPT_TEMPLATE_code_improvement or configs/prompts/code_improvement.txt
-    """
-    template = PromptTemplate(
-        input_variables=["original_code", "issues", "file_path"],
-        template=f"""
+_CODE_IMPROVEMENT_TEMPLATE = f"""
 You are an expert software engineer tasked with improving code based on identified issues.
 
 FILE: {{file_path}}
@@ -112,25 +92,10 @@ Requirements:
 6. Add or improve documentation where needed
 7. Ensure the improved code is functionally equivalent to the original
 
-{RETURN_JSON_ONLY}
+{RETURN_JSON}
 """
-    )
-    
-    return template.format(
-        original_code=original_code,
-        issues=_format_issues(issues),
-        file_path=file_path
-    )
-
 
-def get_security_analysis_prompt(code: str, file_path: str = "") -> str:
-    """
-    Generates a prompt specifically for security analysis.
-    You can override this prompt via PROMPT_TEMPLATE_security_analysis or configs/prompts/security_analysis.txt
-    """
-    template = PromptTemplate(
-        input_variables=["code", "file_path"],
-        template=f"""
+_SECURITY_ANALYSIS_TEMPLATE = f"""
 You are a security expert specializing in code security analysis.
 
 FILE: {{file_path}}
@@ -153,36 +118,25 @@ Please perform a comprehensive security analysis and identify potential vulnerab
 
 Provide your analysis in JSON format:
 
-{{
+{{{{
     "security_issues": [
-        {{
+        {{{{
             "type": "<vulnerability_type>",
-            "severity": "critical|high|medium|low",
+            {_SEVERITY_ENUM},
             "line": <line_number>,
             "description": "<detailed description>",
             "cve_reference": "<relevant_CVE_if_applicable>",
             "mitigation": "<specific_mitigation_steps>"
-        }}
+        }}}}
     ],
     "overall_security_score": <1-10>,
     "recommendations": ["<list_of_security_recommendations>"]
-}}
+}}}}
 
-{RETURN_JSON_ONLY}
+{RETURN_JSON}
 """
-    )
-    
-    return template.format(code=code, file_path=file_path)
-
 
-def get_performance_analysis_prompt(code: str, file_path: str = "") -> str:
-    """
-    Generates a prompt specifically for performance analysis.
-    You can override this prompt via PROMPT_TEMPLATE_performance_analysis or configs/prompts/performance_analysis.txt
-    """
-    template = PromptTemplate(
-        input_variables=["code", "file_path"],
-        template=f"""
+_PERFORMANCE_ANALYSIS_TEMPLATE = f"""
 You are a performance optimization expert.
 
 FILE: {{file_path}}
@@ -205,36 +159,25 @@ Please perform a comprehensive performance analysis and identify optimization op
 
 Provide your analysis in JSON format:
 
-{{
+{{{{
     "performance_issues": [
-        {{
+        {{{{
             "type": "<performance_issue_type>",
-            "severity": "critical|high|medium|low",
+            {_SEVERITY_ENUM},
             "line": <line_number>,
             "description": "<detailed_description>",
             "impact": "<performance_impact_description>",
             "optimization": "<specific_optimization_suggestion>"
-        }}
+        }}}}
     ],
     "overall_performance_score": <1-10>,
     "optimization_opportunities": ["<list_of_optimization_opportunities>"]
-}}
+}}}}
 
-{RETURN_JSON_ONLY}
+{RETURN_JSON}
 """
-    )
-    
-    return template.format(code=code, file_path=file_path)
-
 
-def get_documentation_prompt(code: str, file_path: str = "") -> str:
-    """
-    Generates a prompt for improving code documentation.
-    You can override this prompt via PROMPT_TEMPLATE_documentation_improvement or configs/prompts/documentation_improvement.txt
-    """
-    template = PromptTemplate(
-        input_variables=["code", "file_path"],
-        template=f"""
+_DOCUMENTATION_IMPROVEMENT_TEMPLATE = f"""
 You are a technical documentation expert.
 
 FILE: {{file_path}}
@@ -252,9 +195,137 @@ Please improve the documentation for this code by:
 
 Provide the improved code with enhanced documentation. Maintain the original functionality while making the code more understandable and maintainable.
 
-{RETURN_JSON_ONLY}
+{RETURN_JSON}
 """
+
+_PROJECT_SUMMARY_TEMPLATE = """
+You are a senior software architect creating a comprehensive project review summary.
+
+PROJECT STRUCTURE:
+{project_structure}
+
+ANALYSIS RESULTS:
+{analysis_results}
+
+Please create a comprehensive project summary report in Markdown format covering:
+
+1. **Executive Summary**
+   - Overall code quality assessment
+   - Key findings and recommendations
+   - Priority areas for improvement
+
+2. **Technical Analysis**
+   - Code quality metrics summary
+   - Security assessment
+   - Performance analysis
+   - Maintainability evaluation
+
+3. **Detailed Findings**
+   - Critical issues requiring immediate attention
+   - High-priority improvements
+   - Medium and low-priority suggestions
+
+4. **Recommendations**
+   - Specific action items
+   - Best practices implementation
+   - Technology stack considerations
+
+5. **Metrics Summary**
+   - Average scores across all files
+   - File-by-file breakdown
+   - Trend analysis
+
+Format the response as clean Markdown with proper headings, lists, and code blocks where appropriate.
+"""
+
+# name -> (input_variables, template body) for the legacy prompt functions;
+# the project summary is streamed instead (see build_summary_prompt_to)
+_TEMPLATE_SPECS = {
+    'code_review': (["reqs", "code", "file_path"], _CODE_REVIEW_TEMPLATE),
+    'code_improvement': (["original_code", "issues", "file_path"], _CODE_IMPROVEMENT_TEMPLATE),
+    'security_analysis': (["code", "file_path"], _SECURITY_ANALYSIS_TEMPLATE),
+    'performance_analysis': (["code", "file_path"], _PERFORMANCE_ANALYSIS_TEMPLATE),
+    'documentation_improvement': (["code", "file_path"], _DOCUMENTATION_IMPROVEMENT_TEMPLATE),
+}
+
+# Pre-parsed (literal, field, spec, conversion) parts for streaming the summary prompt
+_SUMMARY_TEMPLATE_PARTS = list(string.Formatter().parse(_PROJECT_SUMMARY_TEMPLATE))
+
+# --- Compiled Template Cache ---
+# PromptTemplate objects are built on first use and reused for the rest of
+# the process.
+_compiled_templates: Optional[Dict[str, PromptTemplate]] = None
+
+
+def _get_compiled_template(name: str) -> PromptTemplate:
+    """Get a compiled legacy PromptTemplate, building all of them on first use."""
+    global _compiled_templates
+    if _compiled_templates is None:
+        _compiled_templates = {
+            template_name: PromptTemplate(input_variables=input_variables, template=body)
+            for template_name, (input_variables, body) in _TEMPLATE_SPECS.items()
+        }
+    return _compiled_templates[name]
+
+
+# --- Legacy vs. Registry Usage ---
+# All new code should use the registry-based prompt system (see registry.py).
+# Legacy functions are provided for backward compatibility but may be deprecated in the future.
+
+def get_review_prompt(requirements: Dict[str, str], code: str, file_path: str = "") -> str:
+    """
+    Generates a prompt for code review.
+    You can override this prompt via PROMPT_TEMPLATE_code_review or configs/prompts/code_review.txt
+    """
+    template = _get_compiled_template('code_review')
+    
+    return template.format(
+        reqs=_format_requirements(requirements),
+        code=code,
+        file_path=file_path
     )
+
+
+def get_improvement_prompt(original_code: str, issues: List[Dict], file_path: str = "") -> str:
+    """
+    Generates a prompt for code improvement based on identified issues.
+    You can override this prompt via PROMPT_TEMPLATE_code_improvement or configs/prompts/code_improvement.txt
+    """
+    template = _get_compiled_template('code_improvement')
+    
+    return template.format(
+        original_code=original_code,
+        issues=_format_issues(issues),
+        file_path=file_path
+    )
+
+
+def get_security_analysis_prompt(code: str, file_path: str = "") -> str:
+    """
+    Generates a prompt specifically for security analysis.
+    You can override this prompt via PROMPT_TEMPLATE_security_analysis or configs/prompts/security_analysis.txt
+    """
+    template = _get_compiled_template('security_analysis')
+    
+    return template.format(code=code, file_path=file_path)
+
+
+def get_performance_analysis_prompt(code: str, file_path: str = "") -> str:
+    """
+    Generates a prompt specifically for performance analysis.
+    You can override this prompt via PROMPT_TEMPLATE_performance_analysis or configs/prompts/performance_analysis.txt
+    """
+    template = _get_compiled_template('performance_analysis')
+    
+    return template.format(code=code, file_path=file_path)
+
+
+def get_documentation_prompt(code: str, file_path: str = "") -> str:
+    """
+    Generates a prompt for improving code documentation.
+    You can override this prompt via PROMPT_TEMPLATE_documentation_improvement or configs/prompts/documentation_improvement.txt
+    """
+    template = _get_compiled_template('documentation_improvement')
     
     return template.format(code=code, file_path=file_path)
 
@@ -296,50 +367,30 @@ def get_summary_prompt(analysis_results: List[Dict], project_structure: Dict) ->
     Returns:
         Formatted prompt string.
     """
-    template = PromptTemplate(
-        input_variables=["analysis_results", "project_structure"],
-        template="""
-You are a senior software architect creating a comprehensive project review summary.
+    buffer = io.StringIO()
+    build_summary_prompt_to(buffer, analysis_results, project_structure)
+    return buffer.getvalue()
 
-PROJECT STRUCTURE:
-{project_structure}
-
-ANALYSIS RESULTS:
-{analysis_results}
-
-Please create a comprehensive project summary report in Markdown format covering:
 
-1. **Executive Summary**
-   - Overall code quality assessment
-   - Key findings and recommendations
-   - Priority areas for improvement
-
-2. **Technical Analysis**
-   - Code quality metrics summary
-   - Security assessment
-   - Performance analysis
-   - Maintainability evaluation
-
-3. **Detailed Findings**
-   - Critical issues requiring immediate attention
-   - High-priority improvements
-   - Medium and low-priority suggestions
-
-4. **Recommendations**
-   - Specific action items
-   - Best practices implementation
-   - Technology stack considerations
-
-5. **Metrics Summary**
-   - Average scores across all files
-   - File-by-file breakdown
-   - Trend analysis
-
-Format the response as clean Markdown with proper headings, lists, and code blocks where appropriate.
-"""
-    )
+def build_summary_prompt_to(writer: TextIO, analysis_results: List[Dict], project_structure: Dict) -> None:
+    """
+    Write the project summary prompt to a text stream.
     
-    return template.format(
-        analysis_results=json.dumps(analysis_results, indent=2),
-        project_structure=json.dumps(project_structure, indent=2)
-    ) 
\ No newline at end of file
+    The static template text is written as-is and the JSON payloads are
+    serialized straight into the stream, so the large intermediate
+    ``json.dumps`` strings are never materialized.
+    
+    Args:
+        writer: Writable text stream (file, StringIO, socket wrapper, ...).
+        analysis_results: List of analysis results from all files.
+        project_structure: Project structure information.
+    """
+    payloads = {
+        'analysis_results': analysis_results,
+        'project_structure': project_structure,
+    }
+    for literal_text, field_name, _, _ in _SUMMARY_TEMPLATE_PARTS:
+        if literal_text:
+            writer.write(literal_text)
+        if field_name is not None:
+            json.dump(payloads[field_name], writer, indent=2) 
\ No newline at end of file
@@ -9,171 +9,80 @@ Best Practice: Use the registry-based prompt system for all new code. Legacy pro
 
 How to override templates:
 - Set environment variable PROMPT_TEMPLATE_<TEMPLATE_NAME>
-- Or add a file in configs/prompts/<template_name>.txt
+- Or add a file in configs/prompts/<template_name>.txt (re-read when its mtime changes)
 - Or add to configs/prompts/prompts.json
 """
 
+import hashlib
 import os
 import json
+import string
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from types import MappingProxyType
+from typing import ClassVar, Dict, Any, Mapping, Optional, List, Sequence, Tuple
 from langchain.prompts import PromptTemplate
 import logging
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# orjson parses several times faster than the stdlib; both accept raw bytes
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
 
-class PromptRegistry:
-    """
-    Centralized registry for managing prompt templates.
+_formatter = string.Formatter()
+
+# (literal_text, field_name) pairs from string.Formatter().parse()
+CompiledTemplate = List[Tuple[str, Optional[str]]]
+
+
+class _MissingDict(dict):
+    """Format mapping that leaves unknown fields as ``{name}`` placeholders."""
     
-    This class provides a flexible way to manage and customize prompts
-    through environment variables, configuration files, or direct API calls.
+    def __missing__(self, key: str) -> str:
+        return '{' + key + '}'
+
+
+def _escape_braces(text: str) -> str:
+    """Escape literal braces so text survives another round of formatting."""
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def _compile_template(template: str) -> Optional[CompiledTemplate]:
     """
+    Pre-parse a template into literal/field pairs for fast rendering.
     
-    def __init__(self, config_dir: Optional[str] = None):
-        """
-        Initialize the prompt registry.
-        
-        Args:
-            config_dir: Directory containing prompt configuration files
-        """
-        self.templates: Dict[str, str] = {}
-        self.config_dir = config_dir or os.getenv('PROMPT_CONFIG_DIR', './configs/prompts')
-        self._load_default_templates()
-        self._load_environment_templates()
-        self._load_file_templates()
-    
-    def _load_default_templates(self):
-        """Load default prompt templates."""
-        self.templates.update({
-            'code_review': self._get_default_code_review_template(),
-            'code_analysis': self._get_default_code_analysis_template(),
-            'code_improvement': self._get_default_code_improvement_template(),
-            'security_analysis': self._get_default_security_analysis_template(),
-            'performance_analysis': self._get_default_performance_analysis_template(),
-            'documentation_improvement': self._get_default_documentation_template(),
-            'project_summary': self._get_default_project_summary_template(),
-            'agent_reviewer_backstory': self._get_default_reviewer_backstory(),
-            'agent_security_backstory': self._get_default_security_backstory(),
-            'agent_performance_backstory': self._get_default_performance_backstory(),
-            'agent_improver_backstory': self._get_default_improver_backstory(),
-            'agent_documentation_backstory': self._get_default_documentation_backstory(),
-        })
-    
-    def _load_environment_templates(self):
-        """Load prompt templates from environment variables."""
-        env_prefix = 'PROMPT_TEMPLATE_'
-        for key, value in os.environ.items():
-            if key.startswith(env_prefix):
-                template_name = key[len(env_prefix):].lower()
-                self.templates[template_name] = value
-                logger.info(f"Loaded prompt template '{template_name}' from environment")
-    
-    def _load_file_templates(self):
-        """Load prompt templates from configuration files."""
-        config_path = Path(self.config_dir)
-        if not config_path.exists():
-            return
-        
-        # Load from JSON file
-        json_file = config_path / 'prompts.json'
-        if json_file.exists():
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    file_templates = json.load(f)
-                self.templates.update(file_templates)
-                logger.info(f"Loaded {len(file_templates)} prompt templates from {json_file}")
-            except Exception as e:
-                logger.warning(f"Failed to load prompt templates from {json_file}: {e}")
-        
-        # Load from individual template files
-        for template_file in config_path.glob('*.txt'):
-            template_name = template_file.stem
-            try:
-                with open(template_file, 'r', encoding='utf-8') as f:
-                    self.templates[template_name] = f.read().strip()
-                logger.info(f"Loaded prompt template '{template_name}' from {template_file}")
-            except Exception as e:
-                logger.warning(f"Failed to load prompt template from {template_file}: {e}")
-    
-    def register(self, name: str, template: str):
-        """
-        Register a new prompt template.
-        
-        Args:
-            name: Template name
-            template: Template content
-        """
-        self.templates[name] = template
-        logger.info(f"Registered prompt template '{name}'")
-    
-    def get(self, name: str, **kwargs) -> str:
-        """
-        Get a prompt template and format it with provided arguments.
-        
-        Args:
-            name: Template name
-            **kwargs: Arguments to format the template
-            
-        Returns:
-            Formatted prompt string
-        Raises:
-            KeyError if required variables are missing.
-        """
-        template = self.templates.get(name)
-        if not template:
-            logger.warning(f"Prompt template '{name}' not found")
-            return ""
-        
-        try:
-            return template.format(**kwargs)
-        except KeyError as e:
-            logger.error(f"Missing required argument '{e}' for template '{name}'. Provided: {list(kwargs.keys())}")
-            raise
-        except Exception as e:
-            logger.error(f"Error formatting template '{name}': {e}")
-            raise
-    
-    def get_prompt_template(self, name: str, input_variables: List[str]) -> PromptTemplate:
-        """
-        Get a LangChain PromptTemplate object.
-        
-        Args:
-            name: Template name
-            input_variables: List of input variable names
-            
-        Returns:
-            LangChain PromptTemplate object
-        """
-        template = self.templates.get(name)
-        if not template:
-            logger.warning(f"Prompt template '{name}' not found")
-            return PromptTemplate(
-                input_variables=input_variables,
-                template="Error: Template not found"
-            )
-        
-        return PromptTemplate(
-            input_variables=input_variables,
-            template=template
-        )
-    
-    def list_templates(self) -> List[str]:
-        """Get list of available template names."""
-        return list(self.templates.keys())
-    
-    def save_templates(self, file_path: str):
-        """Save all templates to a JSON file."""
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.templates, f, indent=2, ensure_ascii=False)
-            logger.info(f"Saved {len(self.templates)} templates to {file_path}")
-        except Exception as e:
-            logger.error(f"Failed to save templates to {file_path}: {e}")
-    
-    def _get_default_code_review_template(self) -> str:
-        return """You are an expert code reviewer with deep knowledge of software engineering best practices, security, and performance optimization.
+    Returns None when the template uses format specs, conversions,
+    positional or attribute/index fields (or does not parse), in which
+    case rendering falls back to str.format. Literal parts are interned
+    so registries and templates sharing the same text share one copy.
+    """
+    try:
+        parsed = list(_formatter.parse(template))
+    except ValueError:
+        return None
+    compiled = []
+    for literal_text, field_name, format_spec, conversion in parsed:
+        if field_name is not None and (format_spec or conversion or not field_name.isidentifier()):
+            return None
+        compiled.append((sys.intern(literal_text) if literal_text else literal_text, field_name))
+    return compiled
+
+
+# Built-in default templates. A read-only module-level mapping: the strings
+# are created once per process (and shared copy-on-write by forked workers).
+# The per-file analysis templates keep all static instructions first and the
+# {file_path}/{language}/{code} fields last, so every request of one kind
+# shares a long identical prefix that provider-side prompt caches can reuse.
+_DEFAULTS: Mapping[str, str] = MappingProxyType({
+    'code_review': """You are an expert code reviewer with deep knowledge of software engineering best practices, security, and performance optimization.
 
 REQUIREMENTS TO EVALUATE AGAINST:
 {reqs}
@@ -214,16 +123,9 @@ Focus on:
 6. Resource optimization (memory, CPU, network)
 7. Documentation quality
 
-Return only valid JSON without any additional text."""
-    
-    def _get_default_code_analysis_template(self) -> str:
-        return """You are an expert code analyzer. Analyze the following code for issues and provide a comprehensive assessment.
-
-File: {file_path}
-Language: {language}
+Return only valid JSON.""",
 
-Code to analyze:
-{code}
+    'code_analysis': """You are an expert code analyzer. Analyze the code below for issues and provide a comprehensive assessment.
 
 Please analyze this code for:
 1. Syntax errors and bugs
@@ -255,19 +157,15 @@ Preferred JSON format:
     "summary": "<brief summary of findings>"
 }}
 
-If you cannot provide JSON, give a plain text analysis with clear issue descriptions."""
-    
-    def _get_default_code_improvement_template(self) -> str:
-        return """You are an expert software engineer tasked with improving code based on identified issues.
+If you cannot provide JSON, give a plain text analysis with clear issue descriptions.
 
 File: {file_path}
 Language: {language}
 
-Original code:
-{code}
+Code to analyze:
+{code}""",
 
-Issues to address:
-{issues}
+    'code_improvement': """You are an expert software engineer tasked with improving code based on identified issues.
 
 Please provide an improved version of the code that addresses all identified issues while maintaining the original functionality.
 
@@ -279,17 +177,19 @@ Requirements:
 5. Add appropriate documentation where needed
 6. Ensure the improved code is functionally equivalent to the original
 
-Return only the complete improved code without any additional explanation or formatting."""
-    
-    def _get_default_security_analysis_template(self) -> str:
-        return """You are a security expert specializing in code security analysis.
+Return only the complete improved code without any additional explanation or formatting.
 
 File: {file_path}
 Language: {language}
 
-Code to analyze:
+Original code:
 {code}
 
+Issues to address:
+{issues}""",
+
+    'security_analysis': """You are a security expert specializing in code security analysis.
+
 Please perform a comprehensive security analysis and identify potential vulnerabilities. Focus on:
 
 1. Input validation and sanitization
@@ -320,16 +220,15 @@ Provide your analysis in JSON format:
     "recommendations": ["<list_of_security_recommendations>"]
 }}
 
-Return only valid JSON."""
-    
-    def _get_default_performance_analysis_template(self) -> str:
-        return """You are a performance optimization expert.
+Return only valid JSON.
 
 File: {file_path}
 Language: {language}
 
 Code to analyze:
-{code}
+{code}""",
+
+    'performance_analysis': """You are a performance optimization expert.
 
 Please perform a comprehensive performance analysis and identify optimization opportunities. Focus on:
 
@@ -361,16 +260,15 @@ Provide your analysis in JSON format:
     "optimization_opportunities": ["<list_of_optimization_opportunities>"]
 }}
 
-Return only valid JSON."""
-    
-    def _get_default_documentation_template(self) -> str:
-        return """You are a technical documentation expert.
+Return only valid JSON.
 
 File: {file_path}
 Language: {language}
 
-Code to document:
-{code}
+Code to analyze:
+{code}""",
+
+    'documentation_improvement': """You are a technical documentation expert.
 
 Please improve the documentation for this code by:
 
@@ -383,10 +281,15 @@ Please improve the documentation for this code by:
 
 Provide the improved code with enhanced documentation. Maintain the original functionality while making the code more understandable and maintainable.
 
-Return the complete documented code."""
-    
-    def _get_default_project_summary_template(self) -> str:
-        return """You are a senior software architect creating a comprehensive project review summary.
+Return the complete documented code.
+
+File: {file_path}
+Language: {language}
+
+Code to document:
+{code}""",
+
+    'project_summary': """You are a senior software architect creating a comprehensive project review summary.
 
 PROJECT STRUCTURE:
 {project_structure}
@@ -422,23 +325,397 @@ Please create a comprehensive project summary report in Markdown format covering
    - File-by-file breakdown
    - Trend analysis
 
-Format the response as clean Markdown with proper headings, lists, and code blocks where appropriate."""
+Format the response as clean Markdown with proper headings, lists, and code blocks where appropriate.""",
+
+    'agent_reviewer_backstory': """You are a senior software engineer with 15+ years of experience in code review, security analysis, and performance optimization. You have worked with multiple programming languages and frameworks, and have a deep understanding of software engineering best practices, design patterns, and common pitfalls. You are known for your thorough analysis and ability to identify both obvious and subtle issues in code.""",
+
+    'agent_security_backstory': """You are a cybersecurity expert specializing in application security, penetration testing, and secure coding practices. You have extensive experience identifying vulnerabilities like SQL injection, XSS, authentication bypasses, and other security issues. You stay updated with the latest security threats and mitigation strategies.""",
+
+    'agent_performance_backstory': """You are a performance engineering expert with deep knowledge of algorithms, data structures, and system optimization. You specialize in identifying performance bottlenecks, memory leaks, and optimization opportunities. You have experience with profiling tools and performance testing methodologies.""",
+
+    'agent_improver_backstory': """You are a software architect and refactoring expert with extensive experience in improving code quality, readability, and maintainability. You excel at applying design patterns, improving code structure, and ensuring best practices are followed while maintaining functionality.""",
+
+    'agent_documentation_backstory': """You are a technical writer and documentation expert with experience in creating clear, comprehensive documentation for software projects. You understand the importance of good documentation for maintainability and knowledge transfer. You excel at writing clear docstrings, comments, and technical reports.""",
+})
+
+
+class PromptRegistry:
+    """
+    Centralized registry for managing prompt templates.
     
-    def _get_default_reviewer_backstory(self) -> str:
-        return """You are a senior software engineer with 15+ years of experience in code review, security analysis, and performance optimization. You have worked with multiple programming languages and frameworks, and have a deep understanding of software engineering best practices, design patterns, and common pitfalls. You are known for your thorough analysis and ability to identify both obvious and subtle issues in code."""
+    This class provides a flexible way to manage and customize prompts
+    through environment variables, configuration files, or direct API calls.
+    """
     
-    def _get_default_security_backstory(self) -> str:
-        return """You are a cybersecurity expert specializing in application security, penetration testing, and secure coding practices. You have extensive experience identifying vulnerabilities like SQL injection, XSS, authentication bypasses, and other security issues. You stay updated with the latest security threats and mitigation strategies."""
+    __slots__ = (
+        'templates', 'config_dir', '_config_path', '_file_sources',
+        '_compiled', '_pt_cache', '_lock',
+    )
     
-    def _get_default_performance_backstory(self) -> str:
-        return """You are a performance engineering expert with deep knowledge of algorithms, data structures, and system optimization. You specialize in identifying performance bottlenecks, memory leaks, and optimization opportunities. You have experience with profiling tools and performance testing methodologies."""
+    # Templates checked by validate_templates() when none are given
+    _DEFAULT_REQUIRED: ClassVar[Tuple[str, ...]] = (
+        'code_review', 'code_analysis', 'code_improvement',
+        'security_analysis', 'performance_analysis',
+        'documentation_improvement', 'project_summary',
+        'agent_reviewer_backstory', 'agent_security_backstory',
+        'agent_performance_backstory', 'agent_improver_backstory',
+        'agent_documentation_backstory',
+    )
     
-    def _get_default_improver_backstory(self) -> str:
-        return """You are a software architect and refactoring expert with extensive experience in improving code quality, readability, and maintainability. You excel at applying design patterns, improving code structure, and ensuring best practices are followed while maintaining functionality."""
+    def __init__(self, config_dir: Optional[str] = None):
+        """
+        Initialize the prompt registry.
+        
+        Args:
+            config_dir: Directory containing prompt configuration files
+        """
+        self.templates: Dict[str, str] = {}
+        # template name -> (override file path, mtime_ns it was read at)
+        self._file_sources: Dict[str, Tuple[Path, int]] = {}
+        # template name -> (template source, pre-parsed parts or None for str.format)
+        self._compiled: Dict[str, Tuple[str, Optional[CompiledTemplate]]] = {}
+        # (name, input_variables) -> (template source, PromptTemplate)
+        self._pt_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[str, PromptTemplate]] = {}
+        # Read paths store lazily loaded defaults and cache entries, and the
+        # process-wide registry is used from worker threads, so every write to
+        # the dicts above (and every iteration over them) holds this lock
+        self._lock = threading.RLock()
+        self.config_dir = config_dir or os.getenv('PROMPT_CONFIG_DIR', './configs/prompts')
+        self._config_path = Path(self.config_dir).resolve()
+        # Defaults are not copied in; _lookup() falls back to _DEFAULTS on first use
+        self._load_environment_templates()
+        self._load_file_templates()
+    
+    def _load_environment_templates(self):
+        """Load prompt templates from environment variables."""
+        env_prefix = 'PROMPT_TEMPLATE_'
+        env_templates = {
+            key.removeprefix(env_prefix).lower(): value
+            for key, value in os.environ.items()
+            if key.startswith(env_prefix)
+        }
+        if not env_templates:
+            return
+        for template_name, template in env_templates.items():
+            self._set_template(template_name, template)
+        logger.info("env: loaded %d prompt templates %s", len(env_templates), sorted(env_templates))
+    
+    def _load_file_templates(self):
+        """Load prompt templates from configuration files."""
+        # One directory pass instead of exists() + prompts.json probe + glob()
+        try:
+            with os.scandir(self._config_path) as it:
+                entries = [entry for entry in it if entry.is_file()]
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        
+        json_file = None
+        txt_files = []
+        for entry in entries:
+            if entry.name == 'prompts.json':
+                json_file = self._config_path / entry.name
+            elif entry.name.endswith('.txt'):
+                txt_files.append(entry)
+        
+        # Load from JSON file
+        if json_file is not None:
+            try:
+                file_templates = _json_loads(json_file.read_bytes())
+                for template_name, template in file_templates.items():
+                    self._set_template(template_name, template)
+                logger.info("%s: loaded %d prompt templates", json_file, len(file_templates))
+            except Exception as e:
+                logger.warning(f"Failed to load prompt templates from {json_file}: {e}")
+        
+        # Load from individual template files; reads are issued concurrently
+        # so slow (e.g. network-mounted) config directories pay ~one round trip
+        if not txt_files:
+            return
+        if len(txt_files) == 1:
+            results = [self._read_template_entry(txt_files[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(8, len(txt_files))) as executor:
+                results = list(executor.map(self._read_template_entry, txt_files))
+        
+        loaded = []
+        for template_file, content, mtime_ns, error in results:
+            template_name = template_file.stem
+            if error is not None:
+                logger.warning(f"Failed to load prompt template from {template_file}: {error}")
+                continue
+            self._set_template(template_name, content)
+            self._file_sources[template_name] = (template_file, mtime_ns)
+            loaded.append(template_name)
+        if loaded:
+            logger.info("%s: loaded %d prompt template files %s", self._config_path, len(loaded), loaded)
+    
+    @staticmethod
+    def _read_template_entry(entry: os.DirEntry) -> Tuple[Path, Optional[str], Optional[int], Optional[Exception]]:
+        """Read one template file; errors are returned rather than raised."""
+        template_file = Path(entry.path)
+        try:
+            mtime_ns = entry.stat().st_mtime_ns
+            return template_file, template_file.read_text(encoding='utf-8').strip(), mtime_ns, None
+        except Exception as e:
+            return template_file, None, None, e
+    
+    def _read_file_template(self, name: str, template_file: Path):
+        """Read a template override file and remember its mtime."""
+        mtime_ns = template_file.stat().st_mtime_ns
+        self._set_template(name, template_file.read_text(encoding='utf-8').strip())
+        self._file_sources[name] = (template_file, mtime_ns)
+    
+    def _refresh_file_template(self, name: str):
+        """Re-read a file-backed template only if its mtime has changed."""
+        source = self._file_sources.get(name)
+        if source is None:
+            return
+        template_file, mtime_ns = source
+        try:
+            if template_file.stat().st_mtime_ns == mtime_ns:
+                return
+            self._read_file_template(name, template_file)
+            logger.info(f"Reloaded prompt template '{name}' from {template_file}")
+        except OSError as e:
+            # Keep serving the cached content if the override disappears
+            logger.warning(f"Failed to reload prompt template from {template_file}: {e}")
+    
+    def _lookup(self, name: str) -> Optional[str]:
+        """Return a template, falling back to (and storing) the built-in default."""
+        template = self.templates.get(name)
+        if template is None and name in _DEFAULTS:
+            with self._lock:
+                template = self.templates.get(name)
+                if template is None:
+                    template = _DEFAULTS[name]
+                    self._set_template(name, template)
+        return template
+    
+    def _materialize_defaults(self):
+        """Store every built-in default not overridden elsewhere."""
+        for name in _DEFAULTS:
+            self._lookup(name)
+    
+    def _set_template(self, name: str, template: str):
+        """Store a template together with its pre-parsed form."""
+        compiled = _compile_template(template)
+        with self._lock:
+            self.templates[name] = template
+            self._compiled[name] = (template, compiled)
+            self._invalidate_rendered(name)
+    
+    def _invalidate_rendered(self, name: str):
+        """Drop cached PromptTemplate objects of a template; the caller holds the lock."""
+        stale = [key for key in self._pt_cache if key[0] == name]
+        for key in stale:
+            del self._pt_cache[key]
+    
+    def _get_compiled(self, name: str, template: str) -> Optional[CompiledTemplate]:
+        """Return the pre-parsed form of a template, re-parsing if it was replaced directly."""
+        entry = self._compiled.get(name)
+        if entry is None or entry[0] is not template:
+            entry = (template, _compile_template(template))
+            with self._lock:
+                self._compiled[name] = entry
+        return entry[1]
+    
+    def register(self, name: str, template: str):
+        """
+        Register a new prompt template.
+        
+        Args:
+            name: Template name
+            template: Template content
+        """
+        self._set_template(name, template)
+        self._file_sources.pop(name, None)
+        logger.debug("Registered prompt template '%s'", name)
+    
+    def get_source(self, name: str) -> Optional[str]:
+        """
+        Get the unformatted text of a prompt template.
+        
+        Args:
+            name: Template name
+            
+        Returns:
+            Template content, or None if no such template exists
+        """
+        self._refresh_file_template(name)
+        return self._lookup(name)
+    
+    def get(self, name: str, *, _strict: bool = True, **kwargs) -> str:
+        """
+        Get a prompt template and format it with provided arguments.
+        
+        Args:
+            name: Template name
+            _strict: If False, missing arguments are left as ``{name}``
+                placeholders instead of raising KeyError (underscored so
+                it cannot clash with a template field)
+            **kwargs: Arguments to format the template
+            
+        Returns:
+            Formatted prompt string
+        Raises:
+            KeyError if required variables are missing (strict mode).
+        """
+        self._refresh_file_template(name)
+        template = self._lookup(name)
+        if not template:
+            logger.warning(f"Prompt template '{name}' not found")
+            return ""
+        
+        # Templates without fields (e.g. agent backstories) need no formatting
+        compiled = self._get_compiled(name, template)
+        if compiled is not None and len(compiled) == 1 and compiled[0][1] is None:
+            return compiled[0][0]
+        
+        try:
+            return self._render(name, template, kwargs if _strict else _MissingDict(kwargs))
+        except KeyError as e:
+            logger.error(f"Missing required argument '{e}' for template '{name}'. Provided: {list(kwargs.keys())}")
+            raise
+        except Exception as e:
+            logger.error(f"Error formatting template '{name}': {e}")
+            raise
+    
+    def _render(self, name: str, template: str, kwargs: Dict[str, Any]) -> str:
+        """Render a template from its pre-parsed parts."""
+        compiled = self._get_compiled(name, template)
+        if compiled is None:
+            return template.format_map(kwargs)
+        parts = []
+        for literal_text, field_name in compiled:
+            if literal_text:
+                parts.append(literal_text)
+            if field_name is not None:
+                # Indexing (not .get) so _MissingDict.__missing__ applies
+                parts.append(format(kwargs[field_name]))
+        return "".join(parts)
+    
+    def partial(self, name: str, **fixed) -> str:
+        """
+        Register a specialization of a template with some fields filled in.
+        
+        Useful when a field (e.g. ``language``) is constant for a whole run:
+        later get() calls on the returned name only substitute the
+        remaining fields. Unfilled placeholders and literal braces are
+        preserved.
+        
+        Args:
+            name: Template name
+            **fixed: Field values to bake into the template
+            
+        Returns:
+            Name of the specialized template
+        Raises:
+            KeyError if the template does not exist.
+        """
+        template = self._lookup(name)
+        if not template:
+            raise KeyError(name)
+        
+        parts = []
+        for literal_text, field_name, format_spec, conversion in _formatter.parse(template):
+            parts.append(_escape_braces(literal_text))
+            if field_name is None:
+                continue
+            if field_name in fixed and not format_spec and not conversion:
+                parts.append(_escape_braces(format(fixed[field_name])))
+            else:
+                parts.append(
+                    '{' + field_name
+                    + ('!' + conversion if conversion else '')
+                    + (':' + format_spec if format_spec else '')
+                    + '}'
+                )
+        specialized = "".join(parts)
+        
+        # Stable across processes and works for unhashable values (lists, dicts)
+        digest = hashlib.blake2b(repr(sorted(fixed.items())).encode('utf-8'), digest_size=8).hexdigest()
+        specialized_name = f"{name}:{digest}"
+        if self.templates.get(specialized_name) != specialized:
+            self.register(specialized_name, specialized)
+        return specialized_name
+    
+    def get_prompt_template(self, name: str, input_variables: Sequence[str]) -> PromptTemplate:
+        """
+        Get a LangChain PromptTemplate object.
+        
+        Args:
+            name: Template name
+            input_variables: Input variable names (any sequence, e.g. a tuple)
+            
+        Returns:
+            LangChain PromptTemplate object; its input_variables are the
+            template's own fields when they differ from input_variables
+        """
+        self._refresh_file_template(name)
+        template = self._lookup(name)
+        if not template:
+            logger.warning(f"Prompt template '{name}' not found")
+            return PromptTemplate(
+                input_variables=list(input_variables),
+                template="Error: Template not found"
+            )
+        
+        cache_key = (name, tuple(input_variables))
+        cached = self._pt_cache.get(cache_key)
+        if cached is not None and cached[0] is template:
+            return cached[1]
+        
+        compiled = self._get_compiled(name, template)
+        if compiled is None:
+            prompt_template = PromptTemplate(
+                input_variables=list(input_variables),
+                template=template
+            )
+        else:
+            # The variables are already known from our own parse, so skip
+            # LangChain's validators (which would re-extract them)
+            template_variables = sorted(self._field_names(name, template))
+            if set(input_variables) == set(template_variables):
+                # Keep the caller's order
+                template_variables = list(input_variables)
+            else:
+                # e.g. an override that drops {language}: use the template's
+                # own fields rather than failing every analysis
+                logger.warning(
+                    "Template '%s' uses variables %s but caller declared %s",
+                    name, template_variables, list(input_variables)
+                )
+            prompt_template = PromptTemplate.construct(
+                input_variables=template_variables,
+                template=template,
+                template_format='f-string',
+                validate_template=False
+            )
+        with self._lock:
+            self._pt_cache[cache_key] = (template, prompt_template)
+        return prompt_template
+    
+    def list_templates(self) -> List[str]:
+        """Get list of available template names."""
+        with self._lock:
+            return list(self.templates) + [name for name in _DEFAULTS if name not in self.templates]
+    
+    def save_templates(self, file_path: str):
+        """Save all templates to a JSON file."""
+        self._materialize_defaults()
+        with self._lock:
+            templates = dict(self.templates)
+        try:
+            if ORJSON_AVAILABLE:
+                # orjson emits UTF-8 directly, no ensure_ascii=False slow path
+                Path(file_path).write_bytes(orjson.dumps(templates, option=orjson.OPT_INDENT_2))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(templates, f, indent=2, ensure_ascii=False)
+            logger.info(f"Saved {len(templates)} templates to {file_path}")
+        except Exception as e:
+            logger.error(f"Failed to save templates to {file_path}: {e}")
     
-    def _get_default_documentation_backstory(self) -> str:
-        return """You are a technical writer and documentation expert with experience in creating clear, comprehensive documentation for software projects. You understand the importance of good documentation for maintainability and knowledge transfer. You excel at writing clear docstrings, comments, and technical reports."""
-
     def validate_templates(self, required_templates: Optional[list] = None) -> bool:
         """
         Validate that all required templates are present and can be formatted with dummy variables.
@@ -448,40 +725,61 @@ Format the response as clean Markdown with proper headings, lists, and code bloc
             True if all templates are valid, False otherwise.
         """
         if required_templates is None:
-            required_templates = [
-                'code_review', 'code_analysis', 'code_improvement',
-                'security_analysis', 'performance_analysis',
-                'documentation_improvement', 'project_summary',
-                'agent_reviewer_backstory', 'agent_security_backstory',
-                'agent_performance_backstory', 'agent_improver_backstory',
-                'agent_documentation_backstory'
-            ]
+            required_templates = self._DEFAULT_REQUIRED
         all_valid = True
+        present = {}
         for name in required_templates:
-            template = self.templates.get(name)
+            template = self._lookup(name)
             if not template:
                 logger.error(f"Missing required prompt template: {name}")
                 all_valid = False
                 continue
-            # Try formatting with dummy variables
+            present[name] = template
+        
+        # One dummy dict covering every field the templates actually use
+        fields = {}
+        for name, template in present.items():
             try:
-                dummy_vars = {k: '<dummy>' for k in ['reqs','code','file_path','issues','original_code','language']}
-                template.format(**dummy_vars)
+                fields[name] = self._field_names(name, template)
+            except ValueError as e:
+                logger.error(f"Template '{name}' failed to parse: {e}")
+                all_valid = False
+        dummy_vars = dict.fromkeys(set().union(*fields.values()), '<dummy>')
+        
+        # Try formatting with dummy variables
+        for name in fields:
+            try:
+                present[name].format_map(dummy_vars)
             except Exception as e:
                 logger.error(f"Template '{name}' failed to format with dummy variables: {e}")
                 all_valid = False
         return all_valid
+    
+    def _field_names(self, name: str, template: str) -> set:
+        """Return the top-level argument names a template references."""
+        compiled = self._get_compiled(name, template)
+        if compiled is not None:
+            return {field_name for _, field_name in compiled if field_name is not None}
+        return {
+            field_name.split('.', 1)[0].split('[', 1)[0]
+            for _, field_name, _, _ in _formatter.parse(template)
+            if field_name is not None
+        }
 
 
 # Global prompt registry instance
 _prompt_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
 
 
 def get_prompt_registry() -> PromptRegistry:
     """Get the global prompt registry instance."""
     global _prompt_registry
     if _prompt_registry is None:
-        _prompt_registry = PromptRegistry()
+        # Double-checked so concurrent agents don't each build a registry
+        with _registry_lock:
+            if _prompt_registry is None:
+                _prompt_registry = PromptRegistry()
     return _prompt_registry
 
 
@@ -490,6 +788,6 @@ def get_prompt(name: str, **kwargs) -> str:
     return get_prompt_registry().get(name, **kwargs)
 
 
-def get_prompt_template(name: str, input_variables: List[str]) -> PromptTemplate:
+def get_prompt_template(name: str, input_variables: Sequence[str]) -> PromptTemplate:
     """Get a LangChain PromptTemplate object."""
     return get_prompt_registry().get_prompt_template(name, input_variables) 
\ No newline at end of file
@@ -10,16 +10,22 @@ try:
 except ImportError:
     # Fallback for newer versions
     from langchain_core.tools import tool
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import ast
+import functools
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 import re
 import json
 import logging
+import threading
 from pathlib import Path
 from langchain.prompts import PromptTemplate
 from langchain_huggingface import HuggingFaceEndpoint
 from huggingface_hub import InferenceClient
 import os
+import time
 
 # Load environment variables from .env file
 try:
@@ -28,76 +34,251 @@ try:
 except ImportError:
     pass  # dotenv not available, continue without it
 
-from .llm_provider import create_llm_provider
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Linear-time DFA regex engine for the fallback pattern scan
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+from .llm_provider import LLMProvider, create_llm_provider, extract_first_json
+from .code_blocks import extract_first_code_block
 from .config.languages import get_language_from_extension
-from .prompts import get_prompt, get_prompt_template
+from .prompts import get_prompt, get_prompt_registry, get_prompt_template
 
 logger = logging.getLogger(__name__)
 
-# Initialize LLM provider
-def get_llm_provider(model_name=None, temperature=0.1):
-    """Get LLM provider with robust fallback system."""
-    config = {
-        'model': model_name or os.getenv('DEFAULT_LLM_MODEL', 'bigcode/starcoder'),
+# orjson decodes LLM responses several times faster than the stdlib, and its
+# JSONDecodeError subclasses json.JSONDecodeError, so handlers are unchanged
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Initialize LLM provider. lru_cache does not stop concurrent first calls from
+# each building a provider (analyze_all fans out three tools at once), so
+# lookups go through a lock.
+_llm_provider_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=8)
+def _create_cached_llm_provider(model_name: str, temperature: float):
+    """Create an LLM provider once per (model, temperature); failures are not cached."""
+    llm_provider = create_llm_provider({
+        'model': model_name,
         'temperature': temperature
-    }
-    
+    })
+    provider_info = llm_provider.get_provider_info()
+    logger.info(f"LLM Provider initialized: {provider_info['provider']}")
+    return llm_provider
+
+
+def get_llm_provider(model_name=None, temperature=0.1):
+    """Get LLM provider with robust fallback system, reused across tool calls."""
+    model_name = model_name or os.getenv('DEFAULT_LLM_MODEL', 'bigcode/starcoder')
     try:
-        llm_provider = create_llm_provider(config)
-        provider_info = llm_provider.get_provider_info()
-        logger.info(f"LLM Provider initialized: {provider_info['provider']}")
-        return llm_provider
+        with _llm_provider_lock:
+            return _create_cached_llm_provider(model_name, temperature)
     except Exception as e:
         logger.error(f"Failed to initialize LLM provider: {e}")
         return None
 
 
-def chunk_code(code: str, max_tokens: int = 1000, overlap: int = 100) -> List[str]:
+get_llm_provider.cache_clear = _create_cached_llm_provider.cache_clear
+
+
+# Input variables of the per-file prompt templates. Immutable tuples, so the
+# prompt registry's PromptTemplate cache is hit without building a key list.
+_FILE_PROMPT_VARIABLES = ("code", "file_path", "language")
+_IMPROVEMENT_PROMPT_VARIABLES = ("code", "issues", "file_path", "language")
+
+# Long-lived worker pools for concurrent LLM calls. Reusing the threads keeps
+# their HTTP sessions (huggingface_hub keeps one per thread) and so their
+# open TLS connections, instead of reconnecting for every file; OpenAI and
+# Groq share one httpx client (see llm_provider). Chunk tasks
+# never submit work themselves, so file analyses can wait on chunk results
+# without deadlocking the pools.
+_CHUNK_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chunk-analysis")
+_ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=3, thread_name_prefix="file-analysis")
+
+# Chunk size and overlap (in estimated tokens) for analyzing large files
+_CHUNK_MAX_TOKENS = 800
+_CHUNK_OVERLAP = 100
+
+# Scores every analysis reports, averaged when chunk results are combined
+_METRIC_KEYS = ('complexity_score', 'maintainability_score', 'security_score', 'performance_score')
+
+
+# --- Analysis Result Cache ---
+# LLM analysis results are stored as JSON under $CACHE_DIR/analysis, keyed by
+# a hash of the tool, model, provider, prompt template text, language, file
+# path and code, so unchanged files are not re-sent to the LLM on the next
+# run. The prompt itself is only rendered on a cache miss. Results from the fallback provider or a fallback path
+# are cheap to recompute and would outlive newly configured keys, so they are
+# never stored. Opt in with CACHE_ENABLED=true.
+_RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _result_cache_path(tool_name: str, prompt_name: str, code: str, file_path: str) -> Optional[Path]:
+    """Return the cache file for one tool invocation, or None if it must not be cached."""
+    if os.getenv('CACHE_ENABLED', 'false').lower() != 'true':
+        return None
+    model_name = os.getenv('DEFAULT_LLM_MODEL', 'bigcode/starcoder')
+    llm = get_llm_provider(model_name, 0.1)
+    if llm is None or getattr(llm, 'current_provider', None) == 'fallback':
+        return None
+    provider = getattr(llm, 'current_provider', None) or type(llm).__name__
+    template = get_prompt_registry().get_source(prompt_name)
+    if template is None:
+        return None
+    key = hashlib.blake2b(digest_size=16)
+    for part in (tool_name, model_name, provider, template,
+                 get_language_from_extension(file_path), file_path):
+        key.update(part.encode('utf-8', 'surrogatepass') + b'\0')
+    key.update(code.encode('utf-8', 'surrogatepass'))
+    return Path(os.getenv('CACHE_DIR', './cache')) / 'analysis' / f'{key.hexdigest()}.json'
+
+
+def _load_cached_result(cache_path: Path) -> Optional[Dict[str, Any]]:
+    """Load a cached result if it exists and has not expired."""
+    try:
+        if time.time() - cache_path.stat().st_mtime > _RESULT_CACHE_TTL_SECONDS:
+            return None
+        result = _json_loads(cache_path.read_bytes())
+        return result if isinstance(result, dict) else None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"Ignoring unreadable analysis cache {cache_path}: {e}")
+        return None
+
+
+def _store_cached_result(cache_path: Path, result: Dict[str, Any]):
+    """Atomically write an LLM analysis result to the cache."""
+    if not isinstance(result, dict) or 'fallback' in str(result.get('analysis_type', 'fallback')):
+        return
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(result, default=str), encoding='utf-8')
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.debug(f"Could not write analysis cache {cache_path}: {e}")
+
+
+def _cached_analysis(prompt_name: str):
+    """Serve an analysis tool's result from the result cache when possible."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(code: str, file_path: str = "") -> Dict[str, Any]:
+            cache_path = _result_cache_path(func.__name__, prompt_name, code, file_path)
+            if cache_path is not None:
+                cached = _load_cached_result(cache_path)
+                if cached is not None:
+                    logger.debug(f"Using cached {func.__name__} result for {file_path}")
+                    return cached
+            
+            result = func(code, file_path)
+            if cache_path is not None:
+                _store_cached_result(cache_path, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _response_to_text(response) -> str:
+    """Normalize an LLM response (str, message dict or object) to its text."""
+    if isinstance(response, str):
+        return response
+    if isinstance(response, dict) and 'content' in response:
+        return response['content']
+    return str(response)
+
+
+def _invoke_for_json(llm, prompt: str):
+    """Invoke the LLM, streaming only until its first JSON object is complete when supported."""
+    if isinstance(llm, LLMProvider):
+        return llm.invoke_json(prompt)
+    return llm.invoke(prompt)
+
+
+def _chunk_line_ranges(lines: List[str], max_tokens: int, overlap: int) -> List[Tuple[int, int]]:
     """
-    Chunk code into smaller pieces for LLM processing.
+    Compute chunk boundaries as (start, end) index ranges over ``lines``.
     
     Args:
-        code: Code to chunk
+        lines: Lines of the code to chunk
         max_tokens: Maximum tokens per chunk
         overlap: Number of tokens to overlap between chunks
         
     Returns:
-        List of code chunks
+        List of half-open line ranges, one per chunk
     """
-    lines = code.split('\n')
-    chunks = []
-    current_chunk = []
+    # Rough estimate: 1 token ≈ 4 characters
+    line_tokens = [len(line) // 4 for line in lines]
+    ranges = []
+    start = 0
     current_length = 0
     
-    for line in lines:
-        # Rough estimate: 1 token ≈ 4 characters
-        line_tokens = len(line) // 4
-        
-        if current_length + line_tokens > max_tokens and current_chunk:
+    # Track each chunk as an index range and leave joining the lines to the
+    # caller, instead of copying and re-inserting line lists for every overlap.
+    for i, tokens in enumerate(line_tokens):
+        if current_length + tokens > max_tokens and i > start:
             # Save current chunk
-            chunks.append('\n'.join(current_chunk))
+            ranges.append((start, i))
             
             # Start new chunk with overlap
-            overlap_lines = []
+            overlap_start = i
             overlap_length = 0
-            for i in range(len(current_chunk) - 1, -1, -1):
-                line_tokens = len(current_chunk[i]) // 4
-                if overlap_length + line_tokens <= overlap:
-                    overlap_lines.insert(0, current_chunk[i])
-                    overlap_length += line_tokens
+            for j in range(i - 1, start - 1, -1):
+                tokens = line_tokens[j]
+                if overlap_length + tokens <= overlap:
+                    overlap_start = j
+                    overlap_length += tokens
                 else:
                     break
             
-            current_chunk = overlap_lines + [line]
-            current_length = overlap_length + line_tokens
+            start = overlap_start
+            current_length = overlap_length + tokens
         else:
-            current_chunk.append(line)
-            current_length += line_tokens
+            current_length += tokens
     
     # Add final chunk
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
+    if start < len(lines):
+        ranges.append((start, len(lines)))
     
+    return ranges
+
+
+def _slice_chunks(code: str, lines: List[str], ranges: List[Tuple[int, int]]) -> List[str]:
+    """Cut each line range out of ``code`` as one slice instead of re-joining its lines."""
+    # offsets[i] is where line i starts; the +1 accounts for the newline
+    offsets = [0]
+    offsets.extend(itertools.accumulate(len(line) + 1 for line in lines))
+    return [code[offsets[start]:offsets[end] - 1] for start, end in ranges]
+
+
+def chunk_code(code: str, max_tokens: int = 1000, overlap: int = 100) -> List[str]:
+    """
+    Chunk code into smaller pieces for LLM processing.
+    
+    Args:
+        code: Code to chunk
+        max_tokens: Maximum tokens per chunk
+        overlap: Number of tokens to overlap between chunks
+        
+    Returns:
+        List of code chunks
+    """
+    # At ~4 characters per token, code this short can never exceed the budget
+    if len(code) <= max_tokens * 4:
+        return [code]
+    
+    lines = code.split('\n')
+    chunks = _slice_chunks(code, lines, _chunk_line_ranges(lines, max_tokens, overlap))
     return chunks if chunks else [code]
 
 
@@ -116,8 +297,14 @@ def analyze_code_with_chunking(code: str, file_path: str = "", llm=None) -> Dict
     if not llm:
         return _fallback_analysis(code, file_path)
     
+    # Small file (see chunk_code), analyze directly without splitting it
+    if len(code) <= _CHUNK_MAX_TOKENS * 4:
+        return _analyze_single_chunk(code, file_path, llm)
+    
     # Chunk the code if it's large
-    chunks = chunk_code(code, max_tokens=800, overlap=100)
+    lines = code.split('\n')
+    ranges = _chunk_line_ranges(lines, max_tokens=_CHUNK_MAX_TOKENS, overlap=_CHUNK_OVERLAP)
+    chunks = _slice_chunks(code, lines, ranges)
     
     if len(chunks) == 1:
         # Small file, analyze directly
@@ -127,27 +314,40 @@ def analyze_code_with_chunking(code: str, file_path: str = "", llm=None) -> Dict
     all_issues = []
     all_metrics = []
     
-    for i, chunk in enumerate(chunks):
-        logger.info(f"Analyzing chunk {i+1}/{len(chunks)} of {file_path}")
-        result = _analyze_single_chunk(chunk, f"{file_path} (chunk {i+1})", llm)
-        
+    # Detect the language once; the per-chunk labels below would also hide
+    # the file extension ("a.py (chunk 2)")
+    language = get_language_from_extension(file_path)
+    
+    # Chunks are independent requests; issue them concurrently so an
+    # N-chunk file costs about one LLM round trip instead of N
+    logger.info(f"Analyzing {len(chunks)} chunks of {file_path}")
+    results = list(_CHUNK_EXECUTOR.map(
+        lambda indexed: _analyze_single_chunk(indexed[1], f"{file_path} (chunk {indexed[0]+1})", llm, language),
+        enumerate(chunks)
+    ))
+    
+    partial = False
+    for (start_line, _), result in zip(ranges, results):
         if isinstance(result, dict):
-            # Adjust line numbers for chunks
+            partial = partial or 'fallback' in str(result.get('analysis_type', ''))
+            # Chunk-relative line numbers become file line numbers
             if 'issues' in result:
                 for issue in result['issues']:
-                    if 'line' in issue:
-                        issue['line'] += i * 800  # Rough estimate
+                    if isinstance(issue.get('line'), int):
+                        issue['line'] += start_line
                 all_issues.extend(result['issues'])
             
             if 'metrics' in result:
                 all_metrics.append(result['metrics'])
     
-    # Combine metrics (average them)
+    # Combine metrics (average them) in a single pass over the chunk results
+    totals = dict.fromkeys(_METRIC_KEYS, 0)
+    for m in all_metrics:
+        for key in _METRIC_KEYS:
+            totals[key] += m.get(key, 5)
     combined_metrics = {
-        'complexity_score': sum(m.get('complexity_score', 5) for m in all_metrics) / len(all_metrics) if all_metrics else 5,
-        'maintainability_score': sum(m.get('maintainability_score', 5) for m in all_metrics) / len(all_metrics) if all_metrics else 5,
-        'security_score': sum(m.get('security_score', 5) for m in all_metrics) / len(all_metrics) if all_metrics else 5,
-        'performance_score': sum(m.get('performance_score', 5) for m in all_metrics) / len(all_metrics) if all_metrics else 5
+        key: totals[key] / len(all_metrics) if all_metrics else 5
+        for key in _METRIC_KEYS
     }
     
     # Add language-agnostic best practices
@@ -174,19 +374,21 @@ def analyze_code_with_chunking(code: str, file_path: str = "", llm=None) -> Dict
         'issues': all_issues,
         'metrics': combined_metrics,
         'file_path': file_path,
-        'analysis_type': 'chunked_llm_analysis',
+        # Chunks that fell back make the combined result partial (and uncacheable)
+        'analysis_type': 'chunked_partial_fallback_analysis' if partial else 'chunked_llm_analysis',
         'summary': f"Analyzed {len(chunks)} chunks, found {len(all_issues)} total issues"
     }
 
 
-def _analyze_single_chunk(code: str, file_path: str, llm) -> Dict[str, Any]:
-    """Analyze a single chunk of code."""
+def _analyze_single_chunk(code: str, file_path: str, llm, language: Optional[str] = None) -> Dict[str, Any]:
+    """Analyze a single chunk of code (``language`` is detected from ``file_path`` if omitted)."""
     try:
         # Get analysis prompt from registry
-        analysis_prompt = get_prompt_template("code_analysis", ["code", "file_path", "language"])
+        analysis_prompt = get_prompt_template("code_analysis", _FILE_PROMPT_VARIABLES)
         
         # Detect language from file extension
-        language = get_language_from_extension(file_path)
+        if language is None:
+            language = get_language_from_extension(file_path)
         
         # Generate analysis using LLM
         prompt = analysis_prompt.format(
@@ -195,7 +397,7 @@ def _analyze_single_chunk(code: str, file_path: str, llm) -> Dict[str, Any]:
             language=language
         )
         
-        response = llm.invoke(prompt)
+        response = _invoke_for_json(llm, prompt)
         
         # Log the raw response for debugging
         logger.debug(f"Raw LLM response type: {type(response)}")
@@ -209,22 +411,14 @@ def _analyze_single_chunk(code: str, file_path: str, llm) -> Dict[str, Any]:
         
         # Parse response - handle both JSON and plain text
         try:
-            # Handle different response formats
-            if isinstance(response, str):
-                response_text = response
-            elif isinstance(response, dict):
-                response_text = response.get('content', str(response))
-            else:
-                response_text = str(response)
+            response_text = _response_to_text(response)
             
             # Try to extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            json_str = extract_first_json(response_text)
             
-            if json_start != -1 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
+            if json_str is not None:
                 try:
-                    result = json.loads(json_str)
+                    result = _json_loads(json_str)
                     
                     return {
                         'issues': result.get('issues', []),
@@ -268,6 +462,7 @@ def _analyze_single_chunk(code: str, file_path: str, llm) -> Dict[str, Any]:
 
 
 @tool
+@_cached_analysis("code_analysis")
 def analyze_code(code: str, file_path: str = "") -> Dict[str, Any]:
     """
     Analyzes code for issues and improvements using LLM.
@@ -314,7 +509,7 @@ def improve_code(code: str, issues: List[Dict], file_path: str = "") -> Dict[str
             return _fallback_improve_code(code, issues, file_path)
         
         # Get improvement prompt from registry
-        improvement_prompt = get_prompt_template("code_improvement", ["code", "issues", "file_path", "language"])
+        improvement_prompt = get_prompt_template("code_improvement", _IMPROVEMENT_PROMPT_VARIABLES)
         
         # Detect language
         language = get_language_from_extension(file_path)
@@ -349,6 +544,7 @@ def improve_code(code: str, issues: List[Dict], file_path: str = "") -> Dict[str
 
 
 @tool
+@_cached_analysis("security_analysis")
 def analyze_security(code: str, file_path: str = "") -> Dict[str, Any]:
     """
     Performs security analysis on code using LLM.
@@ -367,7 +563,7 @@ def analyze_security(code: str, file_path: str = "") -> Dict[str, Any]:
             return _fallback_security_analysis(code, file_path)
         
         # Get security analysis prompt from registry
-        security_prompt = get_prompt_template("security_analysis", ["code", "file_path", "language"])
+        security_prompt = get_prompt_template("security_analysis", _FILE_PROMPT_VARIABLES)
         
         # Detect language
         language = get_language_from_extension(file_path)
@@ -379,26 +575,18 @@ def analyze_security(code: str, file_path: str = "") -> Dict[str, Any]:
             language=language
         )
         
-        response = llm.invoke(prompt)
+        response = _invoke_for_json(llm, prompt)
         
         # Parse response - handle both JSON and plain text
         try:
-            # Handle different response formats
-            if isinstance(response, str):
-                response_text = response
-            elif isinstance(response, dict):
-                response_text = response.get('content', str(response))
-            else:
-                response_text = str(response)
+            response_text = _response_to_text(response)
             
             # Try to extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            json_str = extract_first_json(response_text)
             
-            if json_start != -1 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
+            if json_str is not None:
                 try:
-                    result = json.loads(json_str)
+                    result = _json_loads(json_str)
                     
                     return {
                         'security_issues': result.get('security_issues', []),
@@ -426,6 +614,7 @@ def analyze_security(code: str, file_path: str = "") -> Dict[str, Any]:
 
 
 @tool
+@_cached_analysis("performance_analysis")
 def analyze_performance(code: str, file_path: str = "") -> Dict[str, Any]:
     """
     Performs performance analysis on code using LLM.
@@ -444,7 +633,7 @@ def analyze_performance(code: str, file_path: str = "") -> Dict[str, Any]:
             return _fallback_performance_analysis(code, file_path)
         
         # Get performance analysis prompt from registry
-        performance_prompt = get_prompt_template("performance_analysis", ["code", "file_path", "language"])
+        performance_prompt = get_prompt_template("performance_analysis", _FILE_PROMPT_VARIABLES)
         
         # Detect language
         language = get_language_from_extension(file_path)
@@ -456,26 +645,18 @@ def analyze_performance(code: str, file_path: str = "") -> Dict[str, Any]:
             language=language
         )
         
-        response = llm.invoke(prompt)
+        response = _invoke_for_json(llm, prompt)
         
         # Parse response - handle both JSON and plain text
         try:
-            # Handle different response formats
-            if isinstance(response, str):
-                response_text = response
-            elif isinstance(response, dict):
-                response_text = response.get('content', str(response))
-            else:
-                response_text = str(response)
+            response_text = _response_to_text(response)
             
             # Try to extract JSON from response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+            json_str = extract_first_json(response_text)
             
-            if json_start != -1 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
+            if json_str is not None:
                 try:
-                    result = json.loads(json_str)
+                    result = _json_loads(json_str)
                     
                     return {
                         'performance_issues': result.get('performance_issues', []),
@@ -521,7 +702,7 @@ def improve_documentation(code: str, file_path: str = "") -> Dict[str, Any]:
             return {'improved_code': code, 'file_path': file_path, 'doc_improved': False}
         
         # Get documentation improvement prompt from registry
-        doc_prompt = get_prompt_template("documentation_improvement", ["code", "file_path", "language"])
+        doc_prompt = get_prompt_template("documentation_improvement", _FILE_PROMPT_VARIABLES)
         
         # Detect language
         language = get_language_from_extension(file_path)
@@ -545,30 +726,120 @@ def improve_documentation(code: str, file_path: str = "") -> Dict[str, Any]:
         return {'improved_code': code}  # Return original code if improvement fails
 
 
+def analyze_all(
+    code: str,
+    file_path: str = "",
+    security: bool = True,
+    performance: bool = True
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Run the independent analyses of one file concurrently.
+    
+    The code, security and performance analyses each make their own LLM call
+    and share no state, so they run in parallel threads and the file takes
+    as long as the slowest call rather than the sum of all three.
+    
+    Args:
+        code: Code to analyze.
+        file_path: Path to the file being analyzed.
+        security: Whether to run the security analysis.
+        performance: Whether to run the performance analysis.
+        
+    Returns:
+        Dictionary with 'analysis', 'security' and 'performance' results;
+        skipped analyses are None.
+    """
+    tool_input = {'code': code, 'file_path': file_path}
+    selected = {'analysis': analyze_code}
+    if security:
+        selected['security'] = analyze_security
+    if performance:
+        selected['performance'] = analyze_performance
+    
+    futures = {key: _ANALYSIS_EXECUTOR.submit(t.invoke, tool_input) for key, t in selected.items()}
+    results = {key: future.result() for key, future in futures.items()}
+    
+    return {
+        'analysis': results['analysis'],
+        'security': results.get('security'),
+        'performance': results.get('performance')
+    }
+
+
 def _extract_code_from_response(response: str, original_code: str) -> str:
     """Extract improved code from an LLM response, handling code blocks and fallback."""
-    # Handle case where response is already a string
-    if isinstance(response, str):
-        response_text = response
-    elif isinstance(response, dict):
-        response_text = response.get('content', str(response))
-    else:
-        response_text = str(response)
+    improved_code = extract_first_code_block(_response_to_text(response))
     
-    # Look for code blocks in the response
-    code_block_patterns = [
-        r'```(?:python|javascript|java|cpp|csharp|php|ruby|go|rust|swift|kotlin|scala|html|css|sql|bash|powershell)?\n(.*?)\n```',
-        r'```\n(.*?)\n```',
-        r'```(.*?)```'
-    ]
+    # If no code blocks found, return the original code
+    return improved_code if improved_code is not None else original_code
+
+
+def _plain_text_line_regex(keywords: List[str], note_prefixes: List[str]):
+    """
+    Compile the line classifier for a plain-text LLM response parser.
     
-    for pattern in code_block_patterns:
-        matches = re.findall(pattern, response_text, re.DOTALL)
-        if matches:
-            return matches[0].strip()
+    Args:
+        keywords: Case-insensitive substrings that make a line start a new issue
+        note_prefixes: Case-sensitive prefixes of a line that annotates the
+            current issue (e.g. 'fix:')
+        
+    Returns:
+        Compiled MULTILINE regex with 'header' and 'note' groups
+    """
+    keyword_alternation = "|".join(re.escape(k) for k in keywords)
+    prefix_alternation = "|".join(re.escape(p) for p in note_prefixes)
+    # A line containing a keyword is a header even if it also starts with a
+    # note prefix, so the header branch is tried first
+    return re.compile(
+        rf"^(?P<header>[^\n]*?(?i:{keyword_alternation})[^\n]*)"
+        rf"|^[^\S\n]*(?:{prefix_alternation})(?P<note>[^\n]*)",
+        re.MULTILINE
+    )
+
+
+# Line classifiers for plain-text LLM responses: one finditer over the whole
+# response replaces splitting it into lines and testing each one in Python.
+_ISSUE_LINES_RE = _plain_text_line_regex(
+    ['issue', 'problem', 'error', 'bug', 'vulnerability', 'security', 'performance'],
+    ['suggestion:', 'fix:', 'recommendation:']
+)
+_SECURITY_LINES_RE = _plain_text_line_regex(
+    ['vulnerability', 'security', 'injection', 'xss', 'csrf', 'authentication', 'authorization', 'encryption'],
+    ['mitigation:', 'fix:', 'solution:']
+)
+_PERFORMANCE_LINES_RE = _plain_text_line_regex(
+    ['performance', 'slow', 'inefficient', 'optimization', 'memory', 'cpu', 'bottleneck', 'complexity'],
+    ['optimization:', 'fix:', 'improvement:']
+)
+
+
+def _scan_plain_text_issues(response_text: str, line_re) -> List[Tuple[str, str]]:
+    """
+    Split a plain-text response into issues.
     
-    # If no code blocks found, return the original code
-    return original_code
+    Args:
+        response_text: Plain-text LLM response
+        line_re: Line classifier from _plain_text_line_regex
+        
+    Returns:
+        (description, note) per issue, where note is the text after the last
+        note prefix that followed the issue's header line ('' if none)
+    """
+    issues = []
+    for match in line_re.finditer(response_text):
+        header = match.group('header')
+        if header is not None:
+            issues.append([header.strip(), ''])
+        elif issues:
+            issues[-1][1] = match.group('note').strip()
+    return [(description, note) for description, note in issues]
+
+
+def _response_preview(response_text: str, limit: int = 200) -> str:
+    """Return the first limit characters of a response, with '...' if it was cut."""
+    if len(response_text) > limit:
+        return response_text[:limit] + '...'
+    return response_text
 
 
 def _parse_plain_text_response(response_text: str, file_path: str, code: str = "") -> Dict[str, Any]:
@@ -578,32 +849,14 @@ def _parse_plain_text_response(response_text: str, file_path: str, code: str = "
         issues = []
         
         # Look for common patterns in the response
-        lines = response_text.split('\n')
-        current_issue = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Look for issue indicators
-            if any(keyword in line.lower() for keyword in ['issue', 'problem', 'error', 'bug', 'vulnerability', 'security', 'performance']):
-                if current_issue:
-                    issues.append(current_issue)
-                
-                current_issue = {
-                    'type': 'general',
-                    'severity': 'medium',
-                    'line': 1,
-                    'description': line,
-                    'suggestion': ''
-                }
-            elif current_issue and line.startswith(('suggestion:', 'fix:', 'recommendation:')):
-                current_issue['suggestion'] = line.split(':', 1)[1].strip() if ':' in line else line
-        
-        # Add the last issue if exists
-        if current_issue:
-            issues.append(current_issue)
+        for description, suggestion in _scan_plain_text_issues(response_text, _ISSUE_LINES_RE):
+            issues.append({
+                'type': 'general',
+                'severity': 'medium',
+                'line': 1,
+                'description': description,
+                'suggestion': suggestion
+            })
         
         # If no structured issues found, create a general summary
         if not issues:
@@ -625,7 +878,7 @@ def _parse_plain_text_response(response_text: str, file_path: str, code: str = "
             },
             'file_path': file_path,
             'analysis_type': 'llm_analysis_plain_text',
-            'summary': response_text[:200] + '...' if len(response_text) > 200 else response_text
+            'summary': _response_preview(response_text)
         }
         
     except Exception as e:
@@ -633,6 +886,173 @@ def _parse_plain_text_response(response_text: str, file_path: str, code: str = "
         return _fallback_analysis(code, file_path)
 
 
+# Static patterns for the fallback analyses, compiled once at import time
+# Scan patterns are matched against lowercased code (see _pattern_matches), so
+# they must be written in lowercase and must not rely on re.IGNORECASE.
+# A pattern of literals joined by '.*' (e.g. 'for.*in range\(') is not
+# compiled: it is checked line by line with str.find, which stays linear where
+# a backtracking '.*' is quadratic on long lines.
+_SECURITY_PATTERNS = [
+    ('subprocess\\.call', 'Command injection vulnerability'),
+    ('shell=true', 'Shell injection risk'),
+    ('eval\\(', 'Code injection vulnerability'),
+    ('exec\\(', 'Code execution vulnerability'),
+    ('open\\(.*input', 'Path traversal vulnerability'),
+    ('input\\(', 'Unvalidated user input'),
+    ('raw_input\\(', 'Unvalidated user input (Python 2)'),
+    ('subprocess\\.', 'Subprocess usage - potential security risk'),
+    ('execute_command', 'Function name suggests command execution'),
+    ('read_file', 'Function name suggests file reading without validation')
+]
+
+_PERFORMANCE_PATTERNS = [
+    (r'result \+= str\(', 'Inefficient string concatenation'),
+    (r'for.*in range\(len\(', 'Use enumerate instead'),
+    (r'for.*for.*in.*range', 'Nested loops may be inefficient'),
+    (r'\.append\(.*\)', 'Consider list comprehension'),
+    (r'list\(range\(', 'Consider direct iteration'),
+    (r'for i in range\(100\):\s*\n\s*for j in range\(100\):\s*\n\s*for k in range\(100\)', 'Triple nested loops - O(n³) complexity'),
+    (r'while true:\s*\n\s*data\.append', 'Potential infinite loop with memory leak'),
+    (r'inefficient_function', 'Function name suggests performance issues')
+]
+
+_SYNTAX_PATTERNS = [
+    (r'def [^(]*\([^)]*\):\s*$', 'Function missing docstring'),
+    (r'class [^(]*\([^)]*\):\s*$', 'Class missing docstring'),
+    (r'import \*', 'Wildcard import - specify imports explicitly'),
+    (r'except:', 'Bare except clause - specify exception type'),
+    (r'print\s*\(', 'Consider using logging instead of print')
+]
+
+
+def _compile_scan_pattern(pattern: str):
+    """Compile a lowercase scan pattern, preferring RE2 when installed."""
+    if RE2_AVAILABLE:
+        try:
+            return re2.compile(pattern)
+        except Exception as e:
+            logger.debug(f"RE2 cannot compile {pattern!r}, using re: {e}")
+    return re.compile(pattern)
+
+
+# A pattern made only of ordinary characters and escaped punctuation
+_LITERAL_PATTERN_RE = re.compile(r'(?:[^.^$*+?{}\[\]\\|()]|\\[^\w\s])*')
+
+
+def _literal_text(pattern: str) -> Optional[str]:
+    """Return the text a pattern matches if it is a plain literal, else None."""
+    if _LITERAL_PATTERN_RE.fullmatch(pattern):
+        return re.sub(r'\\(.)', r'\1', pattern)
+    return None
+
+
+def _keyword_sequence(pattern: str) -> Optional[Tuple[str, ...]]:
+    """Return the literals of a 'a.*b.*c' pattern, else None."""
+    parts = pattern.split('.*')
+    if len(parts) < 2:
+        return None
+    keywords = tuple(_literal_text(part) for part in parts)
+    if not all(keywords):
+        return None
+    return keywords
+
+
+def _find_keyword_sequence(text: str, keywords: Tuple[str, ...]) -> int:
+    """
+    Find keywords in order within one line, as the regex 'a.*b.*c' would.
+    
+    Only the first occurrence of the first keyword on each line needs trying,
+    and every search is bounded by the line end, so the scan is linear.
+    
+    Returns:
+        Offset of the first keyword on the first matching line, or -1
+    """
+    first = keywords[0]
+    start = text.find(first)
+    while start >= 0:
+        line_end = text.find('\n', start)
+        if line_end < 0:
+            line_end = len(text)
+        end = start + len(first)
+        for keyword in keywords[1:]:
+            end = text.find(keyword, end, line_end)
+            if end < 0:
+                break
+            end += len(keyword)
+        else:
+            return start
+        start = text.find(first, line_end)
+    return -1
+
+
+def _compile_pattern_group(patterns):
+    """
+    Compile a pattern list into (combined_regex, ((matcher, description), ...)).
+    
+    Literal patterns keep their text as the matcher and are found with
+    str.find; keyword sequences keep a tuple of literals (see
+    _find_keyword_sequence); only real regexes are compiled. The combined
+    prefilter only needs the first literal of a keyword sequence.
+    """
+    prefilters = []
+    compiled = []
+    for pattern, description in patterns:
+        literal = _literal_text(pattern)
+        keywords = _keyword_sequence(pattern) if literal is None else None
+        if literal is not None:
+            matcher = literal
+        elif keywords is not None:
+            matcher = keywords
+            pattern = pattern.split('.*', 1)[0]
+        else:
+            matcher = _compile_scan_pattern(pattern)
+        prefilters.append(pattern)
+        compiled.append((matcher, description))
+    combined = _compile_scan_pattern("|".join(f"(?:{p})" for p in prefilters))
+    return combined, tuple(compiled)
+
+
+_SECURITY_SCAN = _compile_pattern_group(_SECURITY_PATTERNS)
+_PERFORMANCE_SCAN = _compile_pattern_group(_PERFORMANCE_PATTERNS)
+_SYNTAX_SCAN = _compile_pattern_group(_SYNTAX_PATTERNS)
+
+# (issue type, severity, suggestion format, compiled pattern group)
+_FALLBACK_PATTERN_GROUPS = (
+    ('security', 'high', 'Review and fix {}', _SECURITY_SCAN),
+    ('performance', 'medium', 'Optimize {}', _PERFORMANCE_SCAN),
+    ('maintainability', 'low', 'Improve {}', _SYNTAX_SCAN),
+)
+
+
+def _pattern_matches(code_lower: str, scan) -> List[Tuple[str, int]]:
+    """
+    Find the patterns of a compiled group that match the code.
+    
+    Args:
+        code_lower: Code to scan, already lowercased by the caller
+        scan: Compiled pattern group from _compile_pattern_group
+        
+    Returns:
+        (description, line number of the first match) for each matching pattern
+    """
+    combined, patterns = scan
+    # One pass over the code rules out the whole group in the common case
+    if not combined.search(code_lower):
+        return []
+    matches = []
+    for matcher, description in patterns:
+        if isinstance(matcher, str):
+            start = code_lower.find(matcher)
+        elif isinstance(matcher, tuple):
+            start = _find_keyword_sequence(code_lower, matcher)
+        else:
+            match = matcher.search(code_lower)
+            start = match.start() if match else -1
+        if start >= 0:
+            matches.append((description, code_lower.count('\n', 0, start) + 1))
+    return matches
+
+
 def _fallback_analysis(code: str, file_path: str) -> Dict[str, Any]:
     """Fallback static analysis when LLM is not available or fails."""
     issues = []
@@ -641,72 +1061,15 @@ def _fallback_analysis(code: str, file_path: str) -> Dict[str, Any]:
     syntax_issues = _check_syntax_errors(code, file_path)
     issues.extend(syntax_issues)
     
-    # Security issue patterns
-    security_patterns = [
-        ('subprocess.call', 'Command injection vulnerability'),
-        ('shell=True', 'Shell injection risk'),
-        ('eval\\(', 'Code injection vulnerability'),
-        ('exec\\(', 'Code execution vulnerability'),
-        ('open\\(.*input', 'Path traversal vulnerability'),
-        ('input\\(', 'Unvalidated user input'),
-        ('raw_input\\(', 'Unvalidated user input (Python 2)'),
-        ('subprocess\\.', 'Subprocess usage - potential security risk'),
-        ('execute_command', 'Function name suggests command execution'),
-        ('read_file', 'Function name suggests file reading without validation')
-    ]
-    
-    # Performance issue patterns
-    performance_patterns = [
-        (r'result \+= str\(', 'Inefficient string concatenation'),
-        (r'for.*in range\(len\(', 'Use enumerate instead'),
-        (r'for.*for.*in.*range', 'Nested loops may be inefficient'),
-        (r'\.append\(.*\)', 'Consider list comprehension'),
-        (r'list\(range\(', 'Consider direct iteration'),
-        (r'for i in range\(100\):\s*\n\s*for j in range\(100\):\s*\n\s*for k in range\(100\)', 'Triple nested loops - O(n³) complexity'),
-        (r'while True:\s*\n\s*data\.append', 'Potential infinite loop with memory leak'),
-        (r'inefficient_function', 'Function name suggests performance issues')
-    ]
-    
-    # Syntax and maintainability patterns
-    syntax_patterns = [
-        (r'def [^(]*\([^)]*\):\s*$', 'Function missing docstring'),
-        (r'class [^(]*\([^)]*\):\s*$', 'Class missing docstring'),
-        (r'import \*', 'Wildcard import - specify imports explicitly'),
-        (r'except:', 'Bare except clause - specify exception type'),
-        (r'print\s*\(', 'Consider using logging instead of print')
-    ]
-    
-    # Check for security issues
-    for pattern, description in security_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
+    code_lower = code.lower()
+    for issue_type, severity, suggestion, scan in _FALLBACK_PATTERN_GROUPS:
+        for description, line in _pattern_matches(code_lower, scan):
             issues.append({
-                'type': 'security',
-                'severity': 'high',
+                'type': issue_type,
+                'severity': severity,
                 'description': description,
-                'line': 1,  # Simplified for testing
-                'suggestion': f'Review and fix {description.lower()}'
-            })
-    
-    # Check for performance issues
-    for pattern, description in performance_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            issues.append({
-                'type': 'performance',
-                'severity': 'medium',
-                'description': description,
-                'line': 1,  # Simplified for testing
-                'suggestion': f'Optimize {description.lower()}'
-            })
-    
-    # Check for syntax and maintainability issues
-    for pattern, description in syntax_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            issues.append({
-                'type': 'maintainability',
-                'severity': 'low',
-                'description': description,
-                'line': 1,  # Simplified for testing
-                'suggestion': f'Improve {description.lower()}'
+                'line': line,
+                'suggestion': suggestion.format(description.lower())
             })
     
     # Calculate basic metrics
@@ -733,14 +1096,15 @@ def _fallback_analysis(code: str, file_path: str) -> Dict[str, Any]:
     ]
     
     issues.extend(production_standards)
+    issue_types = {issue['type'] for issue in issues}
     
     return {
         'issues': issues,
         'metrics': {
             'complexity_score': min(10, max(1, complexity // 10)),
             'maintainability_score': 5 if not issues else max(1, 5 - len(issues)),
-            'security_score': 5 if not [i for i in issues if i['type'] == 'security'] else 3,
-            'performance_score': 5 if not [i for i in issues if i['type'] == 'performance'] else 4
+            'security_score': 3 if 'security' in issue_types else 5,
+            'performance_score': 4 if 'performance' in issue_types else 5
         },
         'file_path': file_path,
         'analysis_type': 'fallback_analysis'
@@ -783,33 +1147,15 @@ def _parse_security_plain_text_response(response_text: str, file_path: str, code
         security_issues = []
         
         # Look for security-related patterns
-        lines = response_text.split('\n')
-        current_issue = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Look for security issue indicators
-            if any(keyword in line.lower() for keyword in ['vulnerability', 'security', 'injection', 'xss', 'csrf', 'authentication', 'authorization', 'encryption']):
-                if current_issue:
-                    security_issues.append(current_issue)
-                
-                current_issue = {
-                    'type': 'security',
-                    'severity': 'medium',
-                    'line': 1,
-                    'description': line,
-                    'cve_reference': '',
-                    'mitigation': ''
-                }
-            elif current_issue and line.startswith(('mitigation:', 'fix:', 'solution:')):
-                current_issue['mitigation'] = line.split(':', 1)[1].strip() if ':' in line else line
-        
-        # Add the last issue if exists
-        if current_issue:
-            security_issues.append(current_issue)
+        for description, mitigation in _scan_plain_text_issues(response_text, _SECURITY_LINES_RE):
+            security_issues.append({
+                'type': 'security',
+                'severity': 'medium',
+                'line': 1,
+                'description': description,
+                'cve_reference': '',
+                'mitigation': mitigation
+            })
         
         # If no structured issues found, create a general summary
         if not security_issues:
@@ -827,7 +1173,7 @@ def _parse_security_plain_text_response(response_text: str, file_path: str, code
             'overall_security_score': 5,
             'file_path': file_path,
             'analysis_type': 'llm_security_plain_text',
-            'recommendations': [response_text[:200] + '...' if len(response_text) > 200 else response_text]
+            'recommendations': [_response_preview(response_text)]
         }
         
     except Exception as e:
@@ -839,31 +1185,16 @@ def _fallback_security_analysis(code: str, file_path: str) -> Dict[str, Any]:
     """Fallback static security analysis when LLM is not available or fails."""
     security_issues = []
     
-    # Security issue patterns for fallback analysis
-    security_patterns = [
-        ('subprocess.call', 'Command injection vulnerability'),
-        ('shell=True', 'Shell injection risk'),
-        ('eval\\(', 'Code injection vulnerability'),
-        ('exec\\(', 'Code execution vulnerability'),
-        ('open\\(.*input', 'Path traversal vulnerability'),
-        ('input\\(', 'Unvalidated user input'),
-        ('raw_input\\(', 'Unvalidated user input (Python 2)'),
-        ('subprocess\\.', 'Subprocess usage - potential security risk'),
-        ('execute_command', 'Function name suggests command execution'),
-        ('read_file', 'Function name suggests file reading without validation')
-    ]
-    
     # Check for security issues
-    for pattern, description in security_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            security_issues.append({
-                'type': 'security',
-                'severity': 'high',
-                'description': description,
-                'line': 1,  # Simplified for testing
-                'cve_reference': '',
-                'mitigation': f'Review and fix {description.lower()}'
-            })
+    for description, line in _pattern_matches(code.lower(), _SECURITY_SCAN):
+        security_issues.append({
+            'type': 'security',
+            'severity': 'high',
+            'description': description,
+            'line': line,
+            'cve_reference': '',
+            'mitigation': f'Review and fix {description.lower()}'
+        })
     
     # Calculate security score
     security_score = 10 if not security_issues else max(1, 10 - len(security_issues))
@@ -884,33 +1215,15 @@ def _parse_performance_plain_text_response(response_text: str, file_path: str, c
         performance_issues = []
         
         # Look for performance-related patterns
-        lines = response_text.split('\n')
-        current_issue = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Look for performance issue indicators
-            if any(keyword in line.lower() for keyword in ['performance', 'slow', 'inefficient', 'optimization', 'memory', 'cpu', 'bottleneck', 'complexity']):
-                if current_issue:
-                    performance_issues.append(current_issue)
-                
-                current_issue = {
-                    'type': 'performance',
-                    'severity': 'medium',
-                    'line': 1,
-                    'description': line,
-                    'impact': '',
-                    'optimization': ''
-                }
-            elif current_issue and line.startswith(('optimization:', 'fix:', 'improvement:')):
-                current_issue['optimization'] = line.split(':', 1)[1].strip() if ':' in line else line
-        
-        # Add the last issue if exists
-        if current_issue:
-            performance_issues.append(current_issue)
+        for description, optimization in _scan_plain_text_issues(response_text, _PERFORMANCE_LINES_RE):
+            performance_issues.append({
+                'type': 'performance',
+                'severity': 'medium',
+                'line': 1,
+                'description': description,
+                'impact': '',
+                'optimization': optimization
+            })
         
         # If no structured issues found, create a general summary
         if not performance_issues:
@@ -927,7 +1240,7 @@ def _parse_performance_plain_text_response(response_text: str, file_path: str, c
             'overall_performance_score': 5,
             'file_path': file_path,
             'analysis_type': 'llm_performance_plain_text',
-            'optimization_opportunities': [response_text[:200] + '...' if len(response_text) > 200 else response_text]
+            'optimization_opportunities': [_response_preview(response_text)]
         }
         
     except Exception as e:
@@ -939,29 +1252,16 @@ def _fallback_performance_analysis(code: str, file_path: str) -> Dict[str, Any]:
     """Fallback static performance analysis when LLM is not available or fails."""
     performance_issues = []
     
-    # Performance issue patterns for fallback analysis
-    performance_patterns = [
-        (r'result \+= str\(', 'Inefficient string concatenation'),
-        (r'for.*in range\(len\(', 'Use enumerate instead'),
-        (r'for.*for.*in.*range', 'Nested loops may be inefficient'),
-        (r'\.append\(.*\)', 'Consider list comprehension'),
-        (r'list\(range\(', 'Consider direct iteration'),
-        (r'for i in range\(100\):\s*\n\s*for j in range\(100\):\s*\n\s*for k in range\(100\)', 'Triple nested loops - O(n³) complexity'),
-        (r'while True:\s*\n\s*data\.append', 'Potential infinite loop with memory leak'),
-        (r'inefficient_function', 'Function name suggests performance issues')
-    ]
-    
     # Check for performance issues
-    for pattern, description in performance_patterns:
-        if re.search(pattern, code, re.IGNORECASE):
-            performance_issues.append({
-                'type': 'performance',
-                'severity': 'medium',
-                'line': 1,  # Simplified for testing
-                'description': description,
-                'impact': 'May cause performance degradation',
-                'optimization': f'Optimize {description.lower()}'
-            })
+    for description, line in _pattern_matches(code.lower(), _PERFORMANCE_SCAN):
+        performance_issues.append({
+            'type': 'performance',
+            'severity': 'medium',
+            'line': line,
+            'description': description,
+            'impact': 'May cause performance degradation',
+            'optimization': f'Optimize {description.lower()}'
+        })
     
     # Calculate performance score
     performance_score = 10 if not performance_issues else max(1, 10 - len(performance_issues))
@@ -975,12 +1275,23 @@ def _fallback_performance_analysis(code: str, file_path: str) -> Dict[str, Any]:
     }
 
 
+# Literal rewrites applied by _fallback_improve_code, keyed by the text they
+# replace. All triggered rewrites are applied in a single re.sub pass.
+_FALLBACK_FIXES = {
+    'shell=True': 'shell=False',
+    'result += str(': 'result_list.append(str(',
+    'def ': 'def ' + '\n    """Add docstring here."""\n    ',
+    'except:': 'except Exception:',
+}
+
+
 def _fallback_improve_code(code: str, issues: List[Dict], file_path: str) -> Dict[str, Any]:
     """Fallback code improvement logic when LLM is not available or fails."""
     if not issues:
         return {'improved_code': code}  # No issues, return original code
     
-    improved_code = code
+    fixes = {}
+    comments = []
     
     # Basic improvements for common issues
     for issue in issues:
@@ -989,38 +1300,42 @@ def _fallback_improve_code(code: str, issues: List[Dict], file_path: str) -> Dic
         
         if issue_type == 'security':
             if 'shell injection' in description:
-                improved_code = improved_code.replace('shell=True', 'shell=False')
+                fixes['shell=True'] = _FALLBACK_FIXES['shell=True']
             elif 'command injection' in description:
                 # Add a comment about the security issue
-                improved_code = f"# SECURITY: Review subprocess usage for command injection\n{improved_code}"
+                comments.append("# SECURITY: Review subprocess usage for command injection")
             elif 'unvalidated user input' in description:
                 # Add input validation comment
-                improved_code = f"# SECURITY: Add input validation\n{improved_code}"
+                comments.append("# SECURITY: Add input validation")
         
         elif issue_type == 'performance':
             if 'string concatenation' in description:
                 # Replace string concatenation with list join
-                improved_code = improved_code.replace(
-                    'result += str(', 'result_list.append(str('
-                )
-                if 'result_list.append' in improved_code:
-                    improved_code = 'result_list = []\n' + improved_code + '\nresult = "".join(result_list)'
+                fixes['result += str('] = _FALLBACK_FIXES['result += str(']
             elif 'nested loops' in description:
                 # Add optimization comment
-                improved_code = f"# PERFORMANCE: Consider optimizing nested loops\n{improved_code}"
+                comments.append("# PERFORMANCE: Consider optimizing nested loops")
         
         elif issue_type == 'maintainability':
             if 'missing docstring' in description:
                 # Add basic docstring template
-                if 'def ' in improved_code:
-                    improved_code = improved_code.replace(
-                        'def ', 
-                        'def ' + '\n    """Add docstring here."""\n    '
-                    )
+                fixes['def '] = _FALLBACK_FIXES['def ']
             elif 'bare except' in description:
                 # Replace bare except with specific exception
-                improved_code = improved_code.replace('except:', 'except Exception:')
+                fixes['except:'] = _FALLBACK_FIXES['except:']
+    
+    improved_code = code
+    if fixes:
+        fix_re = re.compile("|".join(re.escape(trigger) for trigger in fixes))
+        improved_code = fix_re.sub(lambda m: fixes[m.group(0)], improved_code)
+    
+    prefix = comments[::-1]  # Most recently added comment goes first
+    suffix = []
+    if 'result += str(' in fixes and 'result_list.append' in improved_code:
+        prefix.append('result_list = []')
+        suffix.append('result = "".join(result_list)')
     
+    improved_code = '\n'.join(prefix + [improved_code] + suffix)
     return {'improved_code': improved_code}
 
 
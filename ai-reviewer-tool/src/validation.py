@@ -5,15 +5,19 @@ This module provides comprehensive validation for all user inputs,
 ensuring security, data integrity, and proper error handling.
 """
 
+import functools
 import os
 import re
-from pathlib import Path
+import stat
+from pathlib import Path, PureWindowsPath
 from typing import Dict, List, Optional, Any, Union
 from urllib.parse import urlparse
 import mimetypes
 
 from .exceptions import ValidationError, SecurityError
-# Lazy import to avoid circular dependencies
+# Lazy import to avoid circular dependencies; cached so the import (and the
+# sys.path fallback) runs once rather than on every config read
+@functools.lru_cache(maxsize=1)
 def _get_config():
     try:
         from configs.config import config
@@ -27,11 +31,29 @@ def _get_config():
         return config
 
 
+def _has_path_traversal(path: str) -> bool:
+    """
+    Check whether a path escapes its base directory.
+    
+    PureWindowsPath accepts both '/' and '\\' as separators, so its parts
+    catch '..' components written in either style, while names merely
+    containing '..' pass. Absolute paths are judged natively; on POSIX a
+    fully qualified Windows path (drive plus root, or a UNC share) is also
+    rejected, but a drive-like prefix such as 'a:b.py' is a plain file name.
+    """
+    parsed = PureWindowsPath(path)
+    if '..' in parsed.parts:
+        return True
+    if os.name == 'nt':
+        return bool(parsed.anchor)
+    return Path(path).is_absolute() or parsed.is_absolute()
+
+
 class InputValidator:
     """Comprehensive input validation for the AI Code Review Tool."""
     
     # File extensions that are allowed for analysis
-    ALLOWED_EXTENSIONS = {
+    ALLOWED_EXTENSIONS = frozenset({
         # Programming languages
         '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cpp', '.c', '.h', '.hpp',
         '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala', '.r',
@@ -47,18 +69,13 @@ class InputValidator:
         # Configuration files
         '.env', '.gitignore', '.dockerfile', '.dockerignore',
         'dockerfile', 'makefile', 'cmakelists.txt'
-    }
+    })
     
     # Dangerous file extensions that should be excluded
-    DANGEROUS_EXTENSIONS = {
+    DANGEROUS_EXTENSIONS = frozenset({
         '.exe', '.bat', '.cmd', '.com', '.pif', '.scr', '.vbs', '.js',
         '.jar', '.war', '.ear', '.apk', '.dmg', '.deb', '.rpm', '.msi'
-    }
-    
-    # Maximum file sizes (in bytes)
-    @property
-    def MAX_FILE_SIZE(self):
-        return _get_config().security.max_input_size_mb * 1024 * 1024
+    })
     
     # Maximum number of files to process
     MAX_FILES = 1000
@@ -69,6 +86,11 @@ class InputValidator:
     # Maximum number of lines per file
     MAX_LINES_PER_FILE = 50000
     
+    # First line longer than MAX_LINE_LENGTH. Anchoring at line starts keeps
+    # the search linear (no rescan from every offset inside a long line) and
+    # makes a match span the whole offending line.
+    _LONG_LINE_RE = re.compile(rf'^[^\n]{{{MAX_LINE_LENGTH + 1},}}', re.MULTILINE)
+    
     # URL patterns for Git repositories
     GIT_URL_PATTERNS = [
         r'^https?://github\.com/[^/]+/[^/]+/?$',
@@ -79,16 +101,37 @@ class InputValidator:
         r'^git@bitbucket\.org:[^/]+/[^/]+\.git$'
     ]
     
-    def __init__(self):
-        """Initialize the validator with configuration."""
-        self._config = None
+    # GIT_URL_PATTERNS as one alternation. Every pattern is anchored and uses
+    # only negated character classes without nested quantifiers, so a match
+    # attempt is linear in the URL length; keep new patterns in that form.
+    _GIT_URL_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in GIT_URL_PATTERNS))
+    
+    # Code patterns rejected in file content
+    SUSPICIOUS_PATTERNS = (
+        r'eval\s*\(',
+        r'exec\s*\(',
+        r'__import__\s*\(',
+        r'os\.system\s*\(',
+        r'subprocess\.call\s*\(',
+        r'input\s*\(',
+        r'raw_input\s*\(',
+    )
+    
+    # All suspicious patterns as one alternation; group p<i> is SUSPICIOUS_PATTERNS[i].
+    # It is matched against lowercased content, so patterns must be lowercase.
+    _SUSPICIOUS_RE = re.compile(
+        '|'.join(f'(?P<p{i}>{pattern})' for i, pattern in enumerate(SUSPICIOUS_PATTERNS))
+    )
     
     @property
     def config(self):
-        """Lazy load configuration."""
-        if self._config is None:
-            self._config = _get_config()
-        return self._config
+        """Lazy load configuration (resolved once per process by _get_config)."""
+        return _get_config()
+    
+    @functools.cached_property
+    def max_file_size(self) -> int:
+        """Maximum file size in bytes, read from the config on first use and then kept."""
+        return self.config.security.max_input_size_mb * 1024 * 1024
     
     def validate_file_path(self, file_path: str) -> Path:
         """Validate a file path and return a Path object."""
@@ -96,40 +139,58 @@ class InputValidator:
             raise ValidationError("File path must be a non-empty string")
         
         # Check for path traversal attacks
-        if '..' in file_path or file_path.startswith('/'):
+        if _has_path_traversal(file_path):
             raise SecurityError("Path traversal detected in file path")
         
         path = Path(file_path)
         
-        # Check if file exists (handle permission errors gracefully)
+        # One stat() answers existence, file type and size
         try:
-            if not path.exists():
-                raise ValidationError(f"File does not exist: {file_path}")
+            file_stat = path.stat()
         except PermissionError:
             # If we can't access the file due to permissions, it's likely a system file
             # This is still a security concern, so raise SecurityError
             raise SecurityError(f"Access denied to file: {file_path}")
+        except OSError:
+            raise ValidationError(f"File does not exist: {file_path}")
         
         # Check if it's actually a file
-        if not path.is_file():
+        if not stat.S_ISREG(file_stat.st_mode):
             raise ValidationError(f"Path is not a file: {file_path}")
         
         # Check file size
-        file_size = path.stat().st_size
-        if file_size > self.MAX_FILE_SIZE:
-            raise ValidationError(
-                f"File too large: {file_size} bytes (max: {self.MAX_FILE_SIZE} bytes)"
-            )
+        self._check_file_size(file_stat.st_size)
         
         return path
     
+    def validate_file_size(self, file_path: Union[str, Path]) -> int:
+        """
+        Reject an oversized file from its on-disk size, before it is read.
+        
+        Args:
+            file_path: Path to the file
+            
+        Returns:
+            File size in bytes
+        """
+        return self._check_file_size(os.stat(file_path).st_size)
+    
+    def _check_file_size(self, file_size: int) -> int:
+        """Raise ValidationError if file_size exceeds max_file_size, else return it."""
+        max_size = self.max_file_size
+        if file_size > max_size:
+            raise ValidationError(
+                f"File too large: {file_size} bytes (max: {max_size} bytes)"
+            )
+        return file_size
+    
     def validate_directory_path(self, dir_path: str) -> Path:
         """Validate a directory path and return a Path object."""
         if not dir_path or not isinstance(dir_path, str):
             raise ValidationError("Directory path must be a non-empty string")
         
         # Check for path traversal attacks
-        if '..' in dir_path or dir_path.startswith('/'):
+        if _has_path_traversal(dir_path):
             raise SecurityError("Path traversal detected in directory path")
         
         path = Path(dir_path)
@@ -159,9 +220,8 @@ class InputValidator:
             raise ValidationError("Git URL too long")
         
         # Validate URL format
-        for pattern in self.GIT_URL_PATTERNS:
-            if re.match(pattern, url):
-                return url
+        if self._GIT_URL_RE.match(url):
+            return url
         
         raise ValidationError(f"Invalid Git URL format: {url}")
     
@@ -170,8 +230,9 @@ class InputValidator:
         if not file_path:
             return False
         
-        path = Path(file_path)
-        extension = path.suffix.lower()
+        # os.path string functions avoid building a Path for every file in a walk
+        file_name = os.path.basename(file_path)
+        extension = os.path.splitext(file_name)[1].lower()
         
         # Check for dangerous extensions
         if extension in self.DANGEROUS_EXTENSIONS:
@@ -182,50 +243,36 @@ class InputValidator:
             return True
         
         # Check for files without extension (like Makefile)
-        filename = path.name.lower()
-        if filename in self.ALLOWED_EXTENSIONS:
+        if file_name.lower() in self.ALLOWED_EXTENSIONS:
             return True
         
         return False
     
     def validate_file_content(self, content: str, file_path: str) -> str:
-        """Validate file content for security and size issues."""
+        """Validate file content for security and line limit issues; size is checked by validate_file_size()."""
         if not isinstance(content, str):
             raise ValidationError("File content must be a string")
         
-        # Check content length
-        if len(content) > self.MAX_FILE_SIZE:
+        # Check for suspicious patterns in a single pass over the content
+        match = self._SUSPICIOUS_RE.search(content.lower())
+        if match:
+            pattern = self.SUSPICIOUS_PATTERNS[int(match.lastgroup[1:])]
+            raise SecurityError(f"Suspicious code pattern detected: {pattern}")
+        
+        # Check line length and line count with C-level scans of the content
+        # rather than splitting it into one string per line
+        match = self._LONG_LINE_RE.search(content)
+        if match:
+            line_number = content.count('\n', 0, match.start()) + 1
             raise ValidationError(
-                f"File content too large: {len(content)} characters"
+                f"Line {line_number} too long: {match.end() - match.start()} characters"
             )
         
-        # Check for suspicious patterns
-        suspicious_patterns = [
-            r'eval\s*\(',
-            r'exec\s*\(',
-            r'__import__\s*\(',
-            r'os\.system\s*\(',
-            r'subprocess\.call\s*\(',
-            r'input\s*\(',
-            r'raw_input\s*\(',
-        ]
-        
-        for pattern in suspicious_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                raise SecurityError(f"Suspicious code pattern detected: {pattern}")
-        
-        # Check line length
-        lines = content.split('\n')
-        for i, line in enumerate(lines, 1):
-            if len(line) > self.MAX_LINE_LENGTH:
-                raise ValidationError(
-                    f"Line {i} too long: {len(line)} characters"
-                )
-        
         # Check number of lines
-        if len(lines) > self.MAX_LINES_PER_FILE:
+        line_count = content.count('\n') + 1
+        if line_count > self.MAX_LINES_PER_FILE:
             raise ValidationError(
-                f"Too many lines: {len(lines)} (max: {self.MAX_LINES_PER_FILE})"
+                f"Too many lines: {line_count} (max: {self.MAX_LINES_PER_FILE})"
             )
         
         return content
@@ -321,7 +368,7 @@ class InputValidator:
                 raise ValidationError("Exclude pattern must be a non-empty string")
             
             # Check for dangerous patterns
-            if '..' in pattern or pattern.startswith('/'):
+            if _has_path_traversal(pattern):
                 raise SecurityError("Dangerous exclude pattern detected")
         
         return patterns
@@ -330,15 +377,10 @@ class InputValidator:
         """Validate a ZIP file path and return a Path object if valid."""
         path = self.validate_file_path(zip_path)
         
-        # Check file extension
+        # Check file extension (validate_file_path has already checked the size)
         if not path.suffix.lower() == '.zip':
             raise ValidationError("File must be a ZIP archive")
         
-        # Check file size
-        file_size = path.stat().st_size
-        if file_size > self.MAX_FILE_SIZE:
-            raise ValidationError(f"ZIP file too large: {file_size} bytes")
-        
         return path
     
     def sanitize_filename(self, filename: str) -> str:
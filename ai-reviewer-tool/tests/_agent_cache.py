@@ -0,0 +1,26 @@
+"""
+Shared CodeReviewAgents for tests.
+
+Building the agents sets up an LLM provider and five CrewAI agents, so tests
+that ask for the same config under the same API-key environment reuse one
+instance for the whole session. This is safe because conftest patches the
+same mock LLM classes into every test; it clears the cache at session start
+and after tests marked real_llm.
+"""
+
+import os
+from functools import lru_cache
+
+from _support import PROVIDER_ENV_VARS
+from src.agents import setup_agents
+
+
+@lru_cache(maxsize=8)
+def _cached_agents(frozen_config, env_key):
+    return setup_agents(dict(frozen_config))
+
+
+def get_agents(llm_config):
+    """Return agents for llm_config, built once per config and provider environment."""
+    env_key = tuple(os.environ.get(name) for name in PROVIDER_ENV_VARS)
+    return _cached_agents(tuple(sorted(llm_config.items())), env_key)
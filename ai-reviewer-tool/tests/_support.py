@@ -0,0 +1,30 @@
+"""
+Helpers shared by the test suite, the API key diagnostics and the test runner.
+"""
+
+import json
+
+# Environment variables that decide which LLM provider gets set up
+PROVIDER_ENV_VARS = (
+    'HUGGINGFACEHUB_API_TOKEN',
+    'GOOGLE_API_KEY',
+    'GROQ_API_KEY',
+    'OPENAI_API_KEY',
+)
+
+
+def load_json_cache(cache_path):
+    """Load a JSON cache file, or return an empty dict if it is missing or unreadable."""
+    try:
+        return json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json_cache(cache_path, cache):
+    """Write a JSON cache file, creating its directory; failures are ignored."""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(cache, indent=2))
+    except OSError:
+        pass  # Caching is best-effort
@@ -1,13 +1,125 @@
+import sys
 import warnings
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
 import pytest
 
+from _support import PROVIDER_ENV_VARS
+
 # Suppress Pydantic deprecation warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning, module="pydantic")
 warnings.filterwarnings("ignore", message=".*PydanticDeprecatedSince20.*")
 
+# LLM client classes and Crew replaced by mocks unless a test is marked real_llm
+_HEAVY_LLM_CLASSES = {
+    'src.llm_provider': ('HuggingFaceEndpoint', 'ChatGoogleGenerativeAI', 'ChatGroq', 'ChatOpenAI'),
+    'src.agents': ('Crew',),
+}
+
+# (module name, class name) -> mock, created on first use. Every test gets the
+# same objects, so agents cached by _agent_cache.get_agents() stay valid.
+_HEAVY_LLM_MOCKS = {}
+
+
 @pytest.fixture(autouse=True)
 def suppress_warnings():
     """Suppress specific warnings during tests."""
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", DeprecationWarning)
-        yield 
\ No newline at end of file
+        yield 
+
+@pytest.fixture
+def hf_env(monkeypatch):
+    """Provide a (fake) Hugging Face token in the environment."""
+    monkeypatch.setenv('HUGGINGFACEHUB_API_TOKEN', 'test_key')
+
+
+@pytest.fixture
+def no_provider_env(monkeypatch):
+    """Unset every provider API key so the LLM provider falls back."""
+    for env_var in PROVIDER_ENV_VARS:
+        monkeypatch.delenv(env_var, raising=False)
+
+
+@pytest.fixture
+def mocked_llm_providers(monkeypatch):
+    """Replace the four provider client classes with mocks; tests set side_effect/return_value."""
+    mocks = SimpleNamespace(hf=MagicMock(), google=MagicMock(), groq=MagicMock(), openai=MagicMock())
+    monkeypatch.setattr('src.llm_provider.HuggingFaceEndpoint', mocks.hf)
+    monkeypatch.setattr('src.llm_provider.ChatGoogleGenerativeAI', mocks.google)
+    monkeypatch.setattr('src.llm_provider.ChatGroq', mocks.groq)
+    monkeypatch.setattr('src.llm_provider.ChatOpenAI', mocks.openai)
+    return mocks
+
+
+@pytest.fixture(scope="session")
+def sample_codebase(tmp_path_factory):
+    """Ingest a one-file codebase once per session; treat the result as read-only."""
+    from src.ingestion import ingest_codebase
+    codebase_dir = tmp_path_factory.mktemp("codebase")
+    (codebase_dir / "test.py").write_text("print('Hello, World!')")
+    return ingest_codebase(str(codebase_dir))
+
+
+def _clear_agent_cache():
+    """Drop agents cached by _agent_cache.get_agents(), if it was imported."""
+    agent_cache = sys.modules.get('_agent_cache')
+    if agent_cache is not None:
+        agent_cache._cached_agents.cache_clear()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def reset_agent_cache():
+    """Start each session (e.g. repeated in-process pytest.main runs) without cached agents."""
+    _clear_agent_cache()
+    _HEAVY_LLM_MOCKS.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def clear_llm_provider_cache():
+    """Don't let a provider cached by one test leak into the next."""
+    yield
+    tools = sys.modules.get('src.tools')
+    if tools is not None:
+        tools.get_llm_provider.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_result_cache(tmp_path, monkeypatch):
+    """Keep cached analysis results out of the working tree and away from other tests."""
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path / 'cache'))
+
+
+@pytest.fixture(autouse=True)
+def mock_heavy_llm_classes(request):
+    """
+    Keep tests from building real LLM clients or crews.
+    
+    Only modules a test file has already imported are patched, so tests that
+    never touch the agents don't pay for importing them. Tests that patch one
+    of these classes themselves simply layer their mock on top. The mocks are
+    shared by all tests; their calls and side effects are reset after each
+    one, but not their return values, which cached agents hold on to.
+    """
+    if request.node.get_closest_marker('real_llm'):
+        yield
+        # Agents built from the real classes must not be reused under the mocks
+        _clear_agent_cache()
+        return
+    
+    with ExitStack() as stack:
+        for module_name, class_names in _HEAVY_LLM_CLASSES.items():
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            for class_name in class_names:
+                # Classes whose optional dependency is missing are never defined
+                if hasattr(module, class_name):
+                    mock = _HEAVY_LLM_MOCKS.setdefault((module_name, class_name), MagicMock())
+                    stack.enter_context(patch.object(module, class_name, mock))
+        yield
+    for mock in _HEAVY_LLM_MOCKS.values():
+        mock.reset_mock(side_effect=True)
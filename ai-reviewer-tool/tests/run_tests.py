@@ -4,44 +4,317 @@ Test runner script for the AI Code Reviewer Tool.
 Runs all tests and provides a comprehensive summary.
 """
 
+import argparse
+import ast
+import hashlib
+import importlib.util
 import os
 import sys
 import subprocess
 import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
 
-# Add the src directory to the path
+import pytest
+
+# Add the project root (for 'src.*' imports) and the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
+from _support import load_json_cache, save_json_cache
+
+
+@dataclass
+class TestResult:
+    """Outcome of one test file."""
+    file: str
+    success: bool
+    returncode: int
+    output: str = ''
+    error: str = ''
+
+
+def _junit_failures(report_path):
+    """Return 'test: message' for each failed or errored test case in a JUnit XML report."""
+    failures = []
+    for _, element in ET.iterparse(report_path):
+        if element.tag == 'testcase':
+            for problem in element:
+                if problem.tag in ('failure', 'error'):
+                    message = problem.get('message', '')
+                    # Collection errors carry a generic message; the cause is
+                    # the last line of the traceback text
+                    lines = (problem.text or '').strip().splitlines()
+                    detail = lines[-1].removeprefix('E').strip() if lines else ''
+                    if detail and detail not in message:
+                        message = f"{message} ({detail})"
+                    failures.append(f"{element.get('name')}: {message}")
+            # Test cases are complete once parsed, so drop them as we go
+            element.clear()
+    return failures
+
 
-def run_test_file(test_file):
-    """Run a specific test file and return results."""
+def run_test_file(test_file, marker_args=()):
+    """Run a specific test file in a subprocess and return results."""
     print(f"\n🧪 Running {test_file}...")
     
-    try:
-        result = subprocess.run([
-            sys.executable, '-m', 'pytest', test_file, '-v', '--tb=short'
-        ], capture_output=True, text=True, cwd=Path(__file__).parent)
+    with tempfile.TemporaryDirectory() as report_dir:
+        report_path = Path(report_dir) / 'report.xml'
+        passed = failed = 0
+        # Only the tail of the output is kept, for when pytest writes no report
+        tail = deque(maxlen=20)
+        try:
+            # Stream pytest's verbose output line by line instead of buffering it
+            with subprocess.Popen([
+                sys.executable, '-m', 'pytest', test_file, '-v', '--tb=short',
+                f'--junitxml={report_path}', *marker_args
+            ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+                    cwd=Path(__file__).parent) as process:
+                for line in process.stdout:
+                    tail.append(line)
+                    # Per-test result lines look like "file.py::Class::test PASSED [ 5%]"
+                    if '::' not in line:
+                        continue
+                    if ' PASSED' in line:
+                        passed += 1
+                    elif ' FAILED' in line or ' ERROR' in line:
+                        failed += 1
+                    else:
+                        continue
+                    print(f"   {line.rstrip()}")
+            returncode = process.returncode
+        except Exception as e:
+            return TestResult(test_file, False, 1, error=str(e))
         
-        return {
-            'file': test_file,
-            'success': result.returncode == 0,
-            'output': result.stdout,
-            'error': result.stderr,
-            'returncode': result.returncode
-        }
+        if report_path.exists():
+            failures = _junit_failures(report_path)
+        else:
+            failures = [f"pytest exited with code {returncode} without writing a report"]
+    
+    print(f"   {passed} passed, {failed} failed")
+    return TestResult(
+        test_file, returncode == 0, returncode,
+        output='\n'.join(failures),
+        error=''.join(tail) if returncode and not failures else ''
+    )
+
+
+def _failure_message(report):
+    """One-line failure message for a pytest report, like a JUnit 'message' attribute."""
+    crash = getattr(report.longrepr, 'reprcrash', None)
+    if crash is not None:
+        return crash.message
+    lines = str(report.longrepr).strip().splitlines()
+    return lines[-1] if lines else 'failed'
+
+
+class _ResultCollector:
+    """pytest plugin that groups test outcomes by the test file they came from."""
+    
+    def __init__(self, test_files):
+        self.files_by_stem = {Path(f).stem: f for f in test_files}
+        self.counts = {f: 0 for f in test_files}
+        self.failures = {f: [] for f in test_files}
+    
+    def _file_for(self, nodeid):
+        return self.files_by_stem.get(Path(nodeid.split('::')[0]).stem)
+    
+    def pytest_collectreport(self, report):
+        test_file = self._file_for(report.nodeid)
+        if report.failed and test_file is not None:
+            self.failures[test_file].append(f"{report.nodeid}: {_failure_message(report)}")
+    
+    def pytest_runtest_logreport(self, report):
+        test_file = self._file_for(report.nodeid)
+        if test_file is None:
+            return
+        if report.when == 'setup':
+            self.counts[test_file] += 1
+        if report.failed:
+            self.failures[test_file].append(f"{report.nodeid} ({report.when}): {_failure_message(report)}")
+
+
+def run_test_files_in_process(test_files, pytest_args=(), marker_args=()):
+    """
+    Run test files in one pytest session inside this interpreter.
+    
+    pytest and the agent dependencies are imported once instead of once per
+    file. When pytest-xdist is installed the session is also spread across
+    CPU cores; --dist=loadfile keeps each file's tests on one worker.
+    
+    Args:
+        test_files: Test file names relative to the test directory
+        pytest_args: Extra pytest arguments, such as --lf, that may select
+            only some tests (files left with none selected count as passed)
+        marker_args: pytest arguments that replace the default marker
+            expression, such as ['-m', '']; files must still collect tests
+    """
+    test_dir = Path(__file__).parent
+    print(f"\n🧪 Running {len(test_files)} test files...")
+    
+    args = [str(test_dir / f) for f in test_files] + [
+        '--tb=short', '-q', '--continue-on-collection-errors'
+    ]
+    if importlib.util.find_spec('xdist') is not None:
+        args += ['-n', 'auto', '--dist=loadfile']
+    args += [*pytest_args, *marker_args]
+    
+    collector = _ResultCollector(test_files)
+    try:
+        pytest.main(args, plugins=[collector])
     except Exception as e:
-        return {
-            'file': test_file,
-            'success': False,
-            'output': '',
-            'error': str(e),
-            'returncode': 1
-        }
+        return [TestResult(f, False, 1, error=str(e)) for f in test_files]
+    
+    results = []
+    for test_file in test_files:
+        problems = collector.failures[test_file]
+        if not collector.counts[test_file] and not pytest_args:
+            problems = problems or ['No tests collected']
+        results.append(TestResult(
+            test_file, not problems, 1 if problems else 0, output='\n'.join(problems)
+        ))
+    return results
+
+
+def run_test_files(test_files, isolated=False, pytest_args=(), marker_args=()):
+    """
+    Run test files in this interpreter, or one subprocess per file if isolated.
+    
+    Test selection arguments need pytest's view of the whole session, so any
+    pytest_args force the single in-process session. marker_args apply to
+    each file on its own and are passed to either runner.
+    """
+    if isolated and not pytest_args:
+        return [run_test_file(test_file, marker_args) for test_file in test_files]
+    return run_test_files_in_process(test_files, pytest_args, marker_args)
+
+
+TEST_DIR = Path(__file__).parent
+PROJECT_ROOT = TEST_DIR.parent
+
+
+def _available_test_files():
+    """Names of the Python files in the test directory, from one directory scan."""
+    with os.scandir(TEST_DIR) as entries:
+        return {entry.name for entry in entries if entry.is_file() and entry.name.endswith('.py')}
 
 
-def run_all_tests():
-    """Run all test files and provide a summary."""
+def _local_module_path(module_name):
+    """Source file of a project or test-helper module such as 'src.tools', or None."""
+    parts = module_name.split('.')
+    for root in (PROJECT_ROOT, TEST_DIR):
+        base = root.joinpath(*parts)
+        for candidate in (base.with_suffix('.py'), base / '__init__.py'):
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def _local_imports(path):
+    """Yield the source files of the local modules that path imports directly."""
+    package = path.relative_to(PROJECT_ROOT).parent.parts
+    for node in ast.walk(ast.parse(path.read_bytes())):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = package[:len(package) - node.level + 1] if node.level else ()
+            module = '.'.join(base + ((node.module,) if node.module else ()))
+            # 'from pkg import name' may import the submodule pkg.name
+            names = [module] + [f"{module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in names:
+            parts = name.split('.')
+            # Importing a.b.c also runs a/__init__.py and a/b/__init__.py
+            for i in range(1, len(parts) + 1):
+                dependency = _local_module_path('.'.join(parts[:i]))
+                if dependency is not None:
+                    yield dependency
+
+
+def _test_file_hash(test_file):
+    """Hash a test file together with conftest.py and every local module it imports."""
+    seen = set()
+    pending = [TEST_DIR / test_file, TEST_DIR / 'conftest.py']
+    while pending:
+        path = pending.pop()
+        if path in seen or not path.is_file():
+            continue
+        seen.add(path)
+        pending.extend(_local_imports(path))
+    
+    digest = hashlib.sha256()
+    for path in sorted(seen):
+        digest.update(str(path.relative_to(PROJECT_ROOT)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _test_hash_cache_path():
+    return Path(os.getenv('CACHE_DIR', PROJECT_ROOT / 'cache')) / 'test_hashes.json'
+
+
+def _summary_lines(results, passed, failed):
+    """Yield the lines of the full-suite summary; details are shown for failures only."""
+    yield "\n" + "=" * 50 + "\n"
+    yield "📊 TEST SUMMARY\n"
+    yield "=" * 50 + "\n"
+    yield f"✅ Passed: {passed}\n"
+    yield f"❌ Failed: {failed}\n"
+    yield f"📈 Success Rate: {(passed/len(results)*100):.1f}%\n"
+    
+    # Show detailed results
+    yield "\n📋 DETAILED RESULTS\n"
+    yield "-" * 30 + "\n"
+    
+    for result in results:
+        status = "✅ PASS" if result.success else "❌ FAIL"
+        yield f"{status} {result.file}\n"
+        
+        if not result.success and result.error:
+            yield f"   Error: {result.error[:100]}...\n"
+    
+    # Show failed test details
+    failed_tests = [r for r in results if not r.success]
+    if failed_tests:
+        yield "\n🔍 FAILED TEST DETAILS\n"
+        yield "-" * 30 + "\n"
+        
+        for result in failed_tests:
+            yield f"\n❌ {result.file}:\n"
+            if result.output:
+                yield "Output:\n"
+                yield result.output + "\n"
+            if result.error:
+                yield "Error:\n"
+                yield result.error.rstrip("\n") + "\n"
+    
+    # Recommendations
+    yield "\n💡 RECOMMENDATIONS\n"
+    yield "-" * 30 + "\n"
+    
+    if failed == 0:
+        yield "🎉 All tests passed! Your AI Code Reviewer Tool is working correctly.\n"
+    else:
+        yield f"⚠️  {failed} test(s) failed. Please review the errors above.\n"
+        yield "🔧 Common fixes:\n"
+        yield "   1. Check that all dependencies are installed: pip install -r requirements.txt\n"
+        yield "   2. Ensure environment variables are set correctly\n"
+        yield "   3. Verify that the src/ directory structure is correct\n"
+        yield "   4. Check that all required files exist\n"
+
+
+def run_all_tests(isolated=False, use_cache=True, pytest_args=()):
+    """
+    Run all test files and provide a summary.
+    
+    With use_cache, files whose sources (and the local modules they import)
+    are unchanged since they last passed are skipped. pytest_args (e.g. --lf)
+    choose tests themselves, so they bypass that cache.
+    """
     print("🚀 AI Code Reviewer Tool - Test Suite")
     print("=" * 50)
     
@@ -60,79 +333,56 @@ def run_all_tests():
     ]
     
     # Filter to only existing files
-    existing_tests = [f for f in test_files if (test_dir / f).exists()]
+    available = _available_test_files()
+    existing_tests = [f for f in test_files if f in available]
     
     print(f"📁 Found {len(existing_tests)} test files")
     print(f"📂 Test directory: {test_dir}")
     
+    # Skip files that passed last time and whose sources haven't changed
+    use_cache = use_cache and not pytest_args
+    test_hashes = load_json_cache(_test_hash_cache_path()) if use_cache else {}
+    current_hashes = {f: _test_file_hash(f) for f in existing_tests}
+    unchanged = [
+        f for f in existing_tests
+        if test_hashes.get(f, {}).get('hash') == current_hashes[f]
+    ]
+    if unchanged:
+        print(f"⏭️  Skipping {len(unchanged)} unchanged test files that passed last run (--no-cache to run them)")
+        existing_tests = [f for f in existing_tests if f not in unchanged]
+    if not existing_tests:
+        print("🎉 Nothing changed since the last green run.")
+        return True
+    
     # Run tests
-    results = []
-    for test_file in existing_tests:
-        result = run_test_file(test_file)
-        results.append(result)
+    results = run_test_files(existing_tests, isolated, pytest_args)
     
-    # Generate summary
-    print("\n" + "=" * 50)
-    print("📊 TEST SUMMARY")
-    print("=" * 50)
+    # Remember which files passed, and forget the ones that didn't. A file
+    # whose tests were deselected by pytest_args hasn't really passed.
+    for result in results if not pytest_args else ():
+        if result.success:
+            test_hashes[result.file] = {
+                'hash': current_hashes[result.file],
+                'last_pass_ts': time.time()
+            }
+        else:
+            test_hashes.pop(result.file, None)
+    save_json_cache(_test_hash_cache_path(), test_hashes)
     
-    passed = sum(1 for r in results if r['success'])
+    passed = sum(1 for r in results if r.success)
     failed = len(results) - passed
-    
-    print(f"✅ Passed: {passed}")
-    print(f"❌ Failed: {failed}")
-    print(f"📈 Success Rate: {(passed/len(results)*100):.1f}%")
-    
-    # Show detailed results
-    print("\n📋 DETAILED RESULTS")
-    print("-" * 30)
-    
-    for result in results:
-        status = "✅ PASS" if result['success'] else "❌ FAIL"
-        print(f"{status} {result['file']}")
-        
-        if not result['success'] and result['error']:
-            print(f"   Error: {result['error'][:100]}...")
-    
-    # Show failed test details
-    failed_tests = [r for r in results if not r['success']]
-    if failed_tests:
-        print(f"\n🔍 FAILED TEST DETAILS")
-        print("-" * 30)
-        
-        for result in failed_tests:
-            print(f"\n❌ {result['file']}:")
-            if result['output']:
-                print("Output:")
-                print(result['output'][:500] + "..." if len(result['output']) > 500 else result['output'])
-            if result['error']:
-                print("Error:")
-                print(result['error'][:500] + "..." if len(result['error']) > 500 else result['error'])
-    
-    # Recommendations
-    print(f"\n💡 RECOMMENDATIONS")
-    print("-" * 30)
-    
-    if failed == 0:
-        print("🎉 All tests passed! Your AI Code Reviewer Tool is working correctly.")
-    else:
-        print(f"⚠️  {failed} test(s) failed. Please review the errors above.")
-        print("🔧 Common fixes:")
-        print("   1. Check that all dependencies are installed: pip install -r requirements.txt")
-        print("   2. Ensure environment variables are set correctly")
-        print("   3. Verify that the src/ directory structure is correct")
-        print("   4. Check that all required files exist")
+    sys.stdout.writelines(_summary_lines(results, passed, failed))
     
     return failed == 0
 
 
-def run_specific_test_category(category):
+def run_specific_test_category(category, isolated=False, pytest_args=()):
     """Run tests for a specific category."""
     categories = {
         'api': ['test_api_keys.py'],
         'core': ['test_agents.py', 'test_ingestion.py', 'test_tools.py'],
         'integration': ['test_integration.py', 'test_workflow.py'],
-        'providers': ['test_llm_provider.py'],
+        'providers': ['test_llm_provider.py', 'test_agents.py'],
         'logging': ['test_logging.py'],
         'prompts': ['test_prompts.py']
     }
@@ -144,20 +394,21 @@ def run_specific_test_category(category):
     
     print(f"🎯 Running {category} tests...")
     
-    test_dir = Path(__file__).parent
     test_files = categories[category]
-    existing_tests = [f for f in test_files if (test_dir / f).exists()]
+    available = _available_test_files()
+    existing_tests = [f for f in test_files if f in available]
     
     if not existing_tests:
         print(f"❌ No test files found for category: {category}")
         return False
     
-    results = []
-    for test_file in existing_tests:
-        result = run_test_file(test_file)
-        results.append(result)
+    # The provider category also covers the llm tests that pytest.ini deselects
+    # by default; a later -m replaces the one from addopts
+    marker_args = ['-m', ''] if category == 'providers' else []
+    
+    results = run_test_files(existing_tests, isolated, pytest_args, marker_args)
     
-    passed = sum(1 for r in results if r['success'])
+    passed = sum(1 for r in results if r.success)
     failed = len(results) - passed
     
     print(f"\n📊 {category.upper()} TESTS SUMMARY")
@@ -169,11 +420,29 @@ def run_specific_test_category(category):
 
 def main():
     """Main function."""
-    if len(sys.argv) > 1:
-        category = sys.argv[1].lower()
-        success = run_specific_test_category(category)
+    parser = argparse.ArgumentParser(description="Run the AI Code Reviewer Tool test suite.")
+    parser.add_argument('category', nargs='?', help="Run only one test category (e.g. core, api)")
+    parser.add_argument('--isolated', action='store_true',
+                        help="Run each test file in its own interpreter")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Run test files even if they are unchanged since they last passed")
+    parser.add_argument('--lf', '--last-failed', action='store_true',
+                        help="Rerun only the tests that failed last time (all tests if none did)")
+    parser.add_argument('--ff', '--failed-first', action='store_true',
+                        help="Run the tests that failed last time first, then the rest")
+    args = parser.parse_args()
+    
+    # pytest keeps the last-failed set in .pytest_cache under the project root
+    pytest_args = []
+    if args.lf:
+        pytest_args += ['--lf', '--last-failed-no-failures=all']
+    if args.ff:
+        pytest_args.append('--ff')
+    
+    if args.category:
+        success = run_specific_test_category(args.category.lower(), args.isolated, pytest_args)
     else:
-        success = run_all_tests()
+        success = run_all_tests(args.isolated, not args.no_cache, pytest_args)
     
     sys.exit(0 if success else 1)
 
@@ -5,13 +5,13 @@ This module tests the ingestion functionality for FRD documents
 and various codebase formats.
 """
 
+import io
 import pytest
-import tempfile
-import os
 import zipfile
 import json
 from unittest.mock import patch, MagicMock
 
+from src.validation import validator
 from src.ingestion import (
     ingest_frd, 
     ingest_codebase, 
@@ -24,7 +24,7 @@ from src.ingestion import (
 class TestIngestion:
     """Test cases for ingestion functionality."""
     
-    def test_ingest_frd_valid_file(self):
+    def test_ingest_frd_valid_file(self, tmp_path):
         """Test ingesting a valid FRD file."""
         # Create a temporary FRD file
         frd_content = """
@@ -32,110 +32,110 @@ class TestIngestion:
         FR-1.2: The system shall support multiple programming languages.
         NFR-1.1: The system shall process codebases of up to 1GB in size.
         """
+        frd_path = tmp_path / "frd.md"
+        frd_path.write_text(frd_content)
         
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            frd_path = f.name
-            f.write(frd_content)
+        requirements = ingest_frd(str(frd_path))
         
-        try:
-            requirements = ingest_frd(frd_path)
-            
-            assert len(requirements) == 3
-            assert 'FR-1.1' in requirements
-            assert 'FR-1.2' in requirements
-            assert 'NFR-1.1' in requirements
-            assert 'accept complete codebases' in requirements['FR-1.1']
-            
-        finally:
-            os.unlink(frd_path)
+        assert len(requirements) == 3
+        assert 'FR-1.1' in requirements
+        assert 'FR-1.2' in requirements
+        assert 'NFR-1.1' in requirements
+        assert 'accept complete codebases' in requirements['FR-1.1']
     
     def test_ingest_frd_invalid_file(self):
         """Test ingesting a non-existent FRD file."""
         with pytest.raises(CodebaseIngestionError):
             ingest_frd("non_existent_file.md")
     
-    def test_ingest_frd_empty_file(self):
+    def test_ingest_frd_empty_file(self, tmp_path):
         """Test ingesting an empty FRD file."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            frd_path = f.name
+        frd_path = tmp_path / "frd.md"
+        frd_path.touch()
         
-        try:
-            requirements = ingest_frd(frd_path)
-            assert len(requirements) == 0
-            
-        finally:
-            os.unlink(frd_path)
+        requirements = ingest_frd(str(frd_path))
+        assert len(requirements) == 0
     
-    def test_ingest_codebase_directory(self):
+    def test_ingest_codebase_directory(self, tmp_path):
         """Test ingesting a directory codebase."""
-        # Create a temporary directory with some code files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create Python file
-            python_file = os.path.join(temp_dir, "test.py")
-            with open(python_file, 'w') as f:
-                f.write("def hello():\n    print('Hello, World!')\n")
-            
-            # Create JavaScript file
-            js_file = os.path.join(temp_dir, "test.js")
-            with open(js_file, 'w') as f:
-                f.write("function hello() {\n    console.log('Hello, World!');\n}\n")
-            
-            # Create a text file (should be included since .txt is in supported extensions)
-            text_file = os.path.join(temp_dir, "exclude.txt")
-            with open(text_file, 'w') as f:
-                f.write("This should be included")
-            
-            codebase_info = ingest_codebase(temp_dir)
-            
-            assert codebase_info['type'] == 'directory'
-            assert len(codebase_info['files']) == 3  # Python, JS, and text files
-            file_names = [f['name'] for f in codebase_info['files']]
-            assert 'test.py' in file_names
-            assert 'test.js' in file_names
-            assert 'exclude.txt' in file_names  # .txt files are included in supported extensions
+        # Create Python file
+        (tmp_path / "test.py").write_text("def hello():\n    print('Hello, World!')\n")
+        
+        # Create JavaScript file
+        (tmp_path / "test.js").write_text("function hello() {\n    console.log('Hello, World!');\n}\n")
+        
+        # Create a text file (should be included since .txt is in supported extensions)
+        (tmp_path / "exclude.txt").write_text("This should be included")
+        
+        codebase_info = ingest_codebase(str(tmp_path))
+        
+        assert codebase_info['type'] == 'directory'
+        assert len(codebase_info['files']) == 3  # Python, JS, and text files
+        file_names = [f['name'] for f in codebase_info['files']]
+        assert 'test.py' in file_names
+        assert 'test.js' in file_names
+        assert 'exclude.txt' in file_names  # .txt files are included in supported extensions
     
-    def test_ingest_codebase_zip(self):
+    def test_ingest_codebase_skips_oversized_files(self, tmp_path, monkeypatch):
+        """Test that files over the validator's size limit are skipped unread."""
+        monkeypatch.setattr(validator, 'max_file_size', 1024)
+        (tmp_path / "small.py").write_text("x = 1\n")
+        (tmp_path / "large.py").write_text("x = 1\n" * 200)
+        
+        codebase_info = ingest_codebase(str(tmp_path))
+        
+        assert [f['name'] for f in codebase_info['files']] == ['small.py']
+    
+    def test_ingest_codebase_zip(self, tmp_path):
         """Test ingesting a ZIP codebase."""
-        # Create a temporary ZIP file
-        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as temp_zip:
-            zip_path = temp_zip.name
+        zip_path = tmp_path / "codebase.zip"
+        # Stored, not deflated: compression is irrelevant for two tiny files
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+            # Add Python file
+            zip_file.writestr('test.py', "def hello():\n    print('Hello, World!')\n")
+            # Add JavaScript file
+            zip_file.writestr('test.js', "function hello() {\n    console.log('Hello, World!');\n}\n")
+        
+        codebase_info = ingest_codebase(str(zip_path))
+        
+        assert codebase_info['type'] == 'zip_file'
+        assert len(codebase_info['files']) == 2
+        file_names = [f['name'] for f in codebase_info['files']]
+        assert 'test.py' in file_names
+        assert 'test.js' in file_names
+    
+    def test_ingest_codebase_zip_in_memory(self):
+        """Test ingesting a ZIP codebase from an in-memory buffer."""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zip_file:
+            zip_file.writestr('test.py', "def hello():\n    print('Hello, World!')\n")
+            zip_file.writestr('test.js', "function hello() {\n    console.log('Hello, World!');\n}\n")
+        buffer.seek(0)
+        
+        codebase_info = ingest_codebase(buffer)
         
-        try:
-            with zipfile.ZipFile(zip_path, 'w') as zip_file:
-                # Add Python file
-                zip_file.writestr('test.py', "def hello():\n    print('Hello, World!')\n")
-                # Add JavaScript file
-                zip_file.writestr('test.js', "function hello() {\n    console.log('Hello, World!');\n}\n")
-            
-            codebase_info = ingest_codebase(zip_path)
-            
-            assert codebase_info['type'] == 'zip_file'
-            assert len(codebase_info['files']) == 2
-            file_names = [f['name'] for f in codebase_info['files']]
-            assert 'test.py' in file_names
-            assert 'test.js' in file_names
-            
-        finally:
-            os.unlink(zip_path)
+        assert codebase_info['type'] == 'zip_file'
+        assert codebase_info['zip_path'] is None
+        file_names = [f['name'] for f in codebase_info['files']]
+        assert sorted(file_names) == ['test.js', 'test.py']
+    
+    def test_ingest_codebase_invalid_stream(self):
+        """Test that a file object that is not a ZIP archive is rejected."""
+        with pytest.raises(CodebaseIngestionError):
+            ingest_codebase(io.BytesIO(b"not a zip archive"))
     
-    def test_ingest_single_file(self):
+    def test_ingest_single_file(self, tmp_path):
         """Test ingesting a single code file."""
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(suffix='.py', delete=False) as tmp_file:
-            file_path = tmp_file.name
-            tmp_file.write(b'print("Hello, World!")')
+        file_path = tmp_path / "hello.py"
+        file_path.write_bytes(b'print("Hello, World!")')
+        
+        # Test ingestion
+        codebase_info = ingest_codebase(str(file_path))
         
-        try:
-            # Test ingestion
-            codebase_info = ingest_codebase(file_path)
-            
-            assert codebase_info['type'] == 'single_file'
-            assert len(codebase_info['files']) == 1
-            assert codebase_info['files'][0]['name'] == os.path.basename(file_path)
-            assert codebase_info['files'][0]['content'] == 'print("Hello, World!")'
-            
-        finally:
-            os.unlink(file_path)
+        assert codebase_info['type'] == 'single_file'
+        assert len(codebase_info['files']) == 1
+        assert codebase_info['files'][0]['name'] == file_path.name
+        assert codebase_info['files'][0]['content'] == 'print("Hello, World!")'
     
     def test_ingest_codebase_invalid_path(self):
         """Test ingesting a non-existent codebase."""
@@ -143,7 +143,7 @@ class TestIngestion:
             ingest_codebase("non_existent_path")
     
     @patch('src.ingestion.git.Repo')
-    def test_ingest_git_repository_url(self, mock_repo):
+    def test_ingest_git_repository_url(self, mock_repo, tmp_path):
         """Test ingesting a Git repository from URL."""
         # Mock Git repository
         mock_repo_instance = MagicMock()
@@ -151,28 +151,24 @@ class TestIngestion:
         mock_repo_instance.head.commit.hexsha = 'abc123'
         mock_repo_instance.head.commit.author.name = 'Test User'
         mock_repo_instance.head.commit.committed_datetime.isoformat.return_value = '2023-01-01T00:00:00'
+        
+        # Create test files in temp directory
+        test_files = {
+            'test.py': 'print("Hello, World!")',
+            'test.js': 'console.log("Hello, World!");'
+        }
+        
+        for filename, content in test_files.items():
+            (tmp_path / filename).write_text(content)
+        
+        # Mock the clone to use our temp directory
         mock_repo.clone_from.return_value = mock_repo_instance
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create test files in temp directory
-            test_files = {
-                'test.py': 'print("Hello, World!")',
-                'test.js': 'console.log("Hello, World!");'
-            }
-            
-            for filename, content in test_files.items():
-                file_path = os.path.join(temp_dir, filename)
-                with open(file_path, 'w') as f:
-                    f.write(content)
-            
-            # Mock the clone to use our temp directory
-            mock_repo.clone_from.return_value = mock_repo_instance
-            
-            codebase_info = ingest_codebase("https://github.com/user/repo")
-            
-            assert codebase_info['type'] == 'git_repository'
-            assert 'repo_info' in codebase_info
-            assert codebase_info['repo_info']['url'] == 'https://github.com/user/repo'
+        codebase_info = ingest_codebase("https://github.com/user/repo")
+        
+        assert codebase_info['type'] == 'git_repository'
+        assert 'repo_info' in codebase_info
+        assert codebase_info['repo_info']['url'] == 'https://github.com/user/repo'
     
     def test_parse_frd_content(self):
         """Test parsing FRD content."""
@@ -200,35 +196,32 @@ class TestIngestion:
         assert get_language_from_extension('.cpp') == 'C++'
         assert get_language_from_extension('.xyz') == 'Unknown'
     
-    def test_ingest_codebase_with_exclusions(self):
+    def test_ingest_codebase_with_exclusions(self, tmp_path):
         """Test ingesting codebase with ignore patterns."""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create files including some that should be ignored
-            files_to_create = {
-                'main.py': 'print("Hello")',
-                'test.py': 'print("Test")',
-                '__pycache__/cache.pyc': 'binary content',
-                '.git/config': 'git config',
-                'node_modules/package.json': '{"name": "test"}'
-            }
-            
-            # Create directories
-            os.makedirs(os.path.join(temp_dir, '__pycache__'), exist_ok=True)
-            os.makedirs(os.path.join(temp_dir, '.git'), exist_ok=True)
-            os.makedirs(os.path.join(temp_dir, 'node_modules'), exist_ok=True)
-            
-            for filename, content in files_to_create.items():
-                file_path = os.path.join(temp_dir, filename)
-                with open(file_path, 'w') as f:
-                    f.write(content)
-            
-            codebase_info = ingest_codebase(temp_dir)
-            
-            # Should only include the Python files
-            assert len(codebase_info['files']) == 2
-            file_names = [f['name'] for f in codebase_info['files']]
-            assert 'main.py' in file_names
-            assert 'test.py' in file_names
+        # Create files including some that should be ignored
+        files_to_create = {
+            'main.py': 'print("Hello")',
+            'test.py': 'print("Test")',
+            '__pycache__/cache.pyc': 'binary content',
+            '.git/config': 'git config',
+            'node_modules/package.json': '{"name": "test"}'
+        }
+        
+        # Create directories
+        (tmp_path / '__pycache__').mkdir()
+        (tmp_path / '.git').mkdir()
+        (tmp_path / 'node_modules').mkdir()
+        
+        for filename, content in files_to_create.items():
+            (tmp_path / filename).write_text(content)
+        
+        codebase_info = ingest_codebase(str(tmp_path))
+        
+        # Should only include the Python files
+        assert len(codebase_info['files']) == 2
+        file_names = [f['name'] for f in codebase_info['files']]
+        assert 'main.py' in file_names
+        assert 'test.py' in file_names
     
     def test_get_ingestion_history(self):
         """Test getting ingestion history."""
@@ -237,29 +230,23 @@ class TestIngestion:
         history = get_ingestion_history()
         assert isinstance(history, list)
     
-    def test_codebase_info_structure(self):
+    def test_codebase_info_structure(self, sample_codebase):
         """Test that codebase_info has the expected structure."""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create a simple Python file
-            python_file = os.path.join(temp_dir, "test.py")
-            with open(python_file, 'w') as f:
-                f.write("print('Hello, World!')")
-            
-            codebase_info = ingest_codebase(temp_dir)
-            
-            # Check required fields
-            assert 'type' in codebase_info
-            assert 'files' in codebase_info
-            assert 'output_dir' in codebase_info
-            assert 'total_files' in codebase_info
-            
-            # Check file structure
-            assert len(codebase_info['files']) == 1
-            file_info = codebase_info['files'][0]
-            
-            assert 'path' in file_info
-            assert 'relative_path' in file_info
-            assert 'name' in file_info
-            assert 'content' in file_info
-            assert 'size' in file_info
-            assert 'language' in file_info 
\ No newline at end of file
+        codebase_info = sample_codebase
+        
+        # Check required fields
+        assert 'type' in codebase_info
+        assert 'files' in codebase_info
+        assert 'output_dir' in codebase_info
+        assert 'total_files' in codebase_info
+        
+        # Check file structure
+        assert len(codebase_info['files']) == 1
+        file_info = codebase_info['files'][0]
+        
+        assert 'path' in file_info
+        assert 'relative_path' in file_info
+        assert 'name' in file_info
+        assert 'content' in file_info
+        assert 'size' in file_info
+        assert 'language' in file_info 
\ No newline at end of file
@@ -6,7 +6,6 @@ ensuring all components work together correctly.
 """
 
 import pytest
-import tempfile
 import os
 import json
 from pathlib import Path
@@ -21,18 +20,17 @@ from src.agents import CodeReviewAgents, setup_agents
 from src.tools import analyze_code, improve_code
 from src.output import generate_output, generate_report
 
+from _agent_cache import get_agents
 
-class TestIntegrationWorkflow:
-    """Test complete integration workflow."""
+
+@pytest.fixture(scope="module")
+def integration_test_file(tmp_path_factory):
+    """Create the test file once per module; ingestion copies it, so tests share it."""
+    temp_dir = tmp_path_factory.mktemp("integration")
+    test_file = temp_dir / "test.py"
     
-    def setup_method(self):
-        """Setup test environment."""
-        self.temp_dir = tempfile.mkdtemp()
-        self.test_file = os.path.join(self.temp_dir, "test.py")
-        
-        # Create a simple test file
-        with open(self.test_file, 'w') as f:
-            f.write("""
+    # Create a simple test file
+    test_file.write_text("""
 def calculate_sum(a, b):
     return a + b
 
@@ -43,26 +41,25 @@ def main():
 if __name__ == "__main__":
     main()
 """)
+    return str(test_file)
+
+
+class TestIntegrationWorkflow:
+    """Test complete integration workflow."""
     
-    def teardown_method(self):
-        """Cleanup test environment."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
-    def test_complete_review_workflow(self):
+    def test_complete_review_workflow(self, sample_codebase, integration_test_file):
         """Test complete review workflow from input to output."""
         # Test configuration
         assert config is not None
         assert isinstance(config, Config)
         
         # Test validation
-        validated_path = validator.validate_file_path(self.test_file)
+        validated_path = validator.validate_file_path(integration_test_file)
         assert validated_path.exists()
         
         # Test ingestion
-        codebase_info = ingest_codebase(self.temp_dir)
-        assert 'files' in codebase_info
-        assert len(codebase_info['files']) > 0
+        assert 'files' in sample_codebase
+        assert len(sample_codebase['files']) > 0
         
         # Test LLM provider
         llm_config = {
@@ -73,7 +70,7 @@ if __name__ == "__main__":
         assert llm_provider is not None
         
         # Test agents setup
-        agents = setup_agents(llm_config)
+        agents = get_agents(llm_config)
         assert agents is not None
         
         # Test analysis
@@ -90,23 +87,21 @@ if __name__ == "__main__":
             })
             assert isinstance(result, dict)
     
-    def test_configuration_validation(self):
+    def test_configuration_validation(self, monkeypatch):
         """Test configuration validation."""
-        # Test valid configuration
-        valid_config = Config()
-        assert valid_config.has_any_api_key() is not None
+        # Test valid configuration (the shared instance was built from the same environment)
+        assert config.has_any_api_key() is not None
         
         # Test invalid configuration
+        # Invalid temperature; monkeypatch restores the variable even when Config() raises
+        monkeypatch.setenv('LLM_TEMPERATURE', '3.0')
         with pytest.raises(ValueError):
-            # Create a config with invalid temperature
-            os.environ['LLM_TEMPERATURE'] = '3.0'  # Invalid temperature
-            invalid_config = Config()
-            del os.environ['LLM_TEMPERATURE']  # Clean up
+            Config()
     
-    def test_input_validation(self):
+    def test_input_validation(self, integration_test_file):
         """Test input validation."""
         # Test valid file path
-        validator.validate_file_path(self.test_file)
+        validator.validate_file_path(integration_test_file)
         
         # Test invalid file path
         with pytest.raises(ValidationError):
@@ -126,64 +121,56 @@ if __name__ == "__main__":
         with pytest.raises(SecurityError):
             validator.validate_file_content(suspicious_content, "test.py")
     
-    def test_llm_provider_fallback(self):
+    def test_llm_provider_fallback(self, no_provider_env):
         """Test LLM provider fallback system."""
         # Test with no API keys
-        with patch.dict(os.environ, {}, clear=True):
-            llm_provider = create_llm_provider({'model': 'test'})
-            assert llm_provider is not None
-            provider_info = llm_provider.get_provider_info()
-            assert provider_info['fallback_mode'] is True
+        llm_provider = create_llm_provider({'model': 'test'})
+        assert llm_provider is not None
+        provider_info = llm_provider.get_provider_info()
+        assert provider_info['fallback_mode'] is True
     
-    def test_llm_provider_fallback_chain_order(self):
+    def test_llm_provider_fallback_chain_order(self, mocked_llm_providers):
         """Test that the fallback chain follows the correct order."""
-        with patch('src.llm_provider.HuggingFaceEndpoint') as mock_hf:
-            with patch('src.llm_provider.ChatGoogleGenerativeAI') as mock_google:
-                with patch('src.llm_provider.ChatGroq') as mock_groq:
-                    with patch('src.llm_provider.ChatOpenAI') as mock_openai:
-                        # Mock all providers to fail
-                        mock_hf.side_effect = Exception("HuggingFace failed")
-                        mock_google.side_effect = Exception("Google failed")
-                        mock_groq.side_effect = Exception("Groq failed")
-                        mock_openai.side_effect = Exception("OpenAI failed")
-                        
-                        # Test LLM provider creation
-                        config = {'model': 'test-model', 'temperature': 0.1}
-                        provider = create_llm_provider(config)
-                        
-                        # Verify fallback chain was attempted in correct order
-                        mock_hf.assert_called_once()
-                        # Google tries multiple models, so it gets called multiple times
-                        assert mock_google.call_count >= 1
-                        # Groq tries multiple models, so it gets called multiple times
-                        assert mock_groq.call_count >= 1
-                        # OpenAI tries multiple models, so it gets called multiple times
-                        assert mock_openai.call_count >= 1
+        # Mock all providers to fail
+        mocked_llm_providers.hf.side_effect = Exception("HuggingFace failed")
+        mocked_llm_providers.google.side_effect = Exception("Google failed")
+        mocked_llm_providers.groq.side_effect = Exception("Groq failed")
+        mocked_llm_providers.openai.side_effect = Exception("OpenAI failed")
+        
+        # Test LLM provider creation
+        config = {'model': 'test-model', 'temperature': 0.1}
+        provider = create_llm_provider(config)
+        
+        # Verify fallback chain was attempted in correct order
+        mocked_llm_providers.hf.assert_called_once()
+        # Google tries multiple models, so it gets called multiple times
+        assert mocked_llm_providers.google.call_count >= 1
+        # Groq tries multiple models, so it gets called multiple times
+        assert mocked_llm_providers.groq.call_count >= 1
+        # OpenAI tries multiple models, so it gets called multiple times
+        assert mocked_llm_providers.openai.call_count >= 1
     
-    def test_google_quota_error_handling(self):
+    def test_google_quota_error_handling(self, mocked_llm_providers):
         """Test that Google quota errors are handled properly."""
-        with patch('src.llm_provider.HuggingFaceEndpoint') as mock_hf:
-            with patch('src.llm_provider.ChatGoogleGenerativeAI') as mock_google:
-                with patch('src.llm_provider.ChatGroq') as mock_groq:
-                    # Mock HuggingFace to fail
-                    mock_hf.side_effect = Exception("HuggingFace failed")
-                    
-                    # Mock Google to fail with quota error
-                    mock_google.side_effect = Exception("429 Quota exceeded")
-                    
-                    # Mock Groq to succeed
-                    mock_groq.return_value = MagicMock()
-                    
-                    # Test LLM provider creation
-                    config = {'model': 'test-model', 'temperature': 0.1}
-                    provider = create_llm_provider(config)
-                    
-                    # Verify Google was tried and failed, then Groq was used
-                    mock_hf.assert_called_once()
-                    # Google tries multiple models, so it gets called multiple times
-                    assert mock_google.call_count >= 1
-                    # Groq tries multiple models, so it gets called multiple times
-                    assert mock_groq.call_count >= 1
+        # Mock HuggingFace to fail
+        mocked_llm_providers.hf.side_effect = Exception("HuggingFace failed")
+        
+        # Mock Google to fail with quota error
+        mocked_llm_providers.google.side_effect = Exception("429 Quota exceeded")
+        
+        # Mock Groq to succeed
+        mocked_llm_providers.groq.return_value = MagicMock()
+        
+        # Test LLM provider creation
+        config = {'model': 'test-model', 'temperature': 0.1}
+        provider = create_llm_provider(config)
+        
+        # Verify Google was tried and failed, then Groq was used
+        mocked_llm_providers.hf.assert_called_once()
+        # Google tries multiple models, so it gets called multiple times
+        assert mocked_llm_providers.google.call_count >= 1
+        # Groq tries multiple models, so it gets called multiple times
+        assert mocked_llm_providers.groq.call_count >= 1
     
     def test_error_handling(self):
         """Test error handling throughout the system."""
@@ -203,33 +190,37 @@ if __name__ == "__main__":
 class TestSecurityFeatures:
     """Test security features and validation."""
     
-    def test_path_traversal_protection(self):
+    @pytest.mark.parametrize("path", [
+        "../../../etc/passwd",
+        "..\\..\\..\\windows\\system32\\config\\sam",
+        "/etc/passwd",
+        "C:\\Windows\\System32\\config\\sam"
+    ])
+    def test_path_traversal_protection(self, path):
         """Test protection against path traversal attacks."""
-        dangerous_paths = [
-            "../../../etc/passwd",
-            "..\\..\\..\\windows\\system32\\config\\sam",
-            "/etc/passwd",
-            "C:\\Windows\\System32\\config\\sam"
-        ]
+        with pytest.raises(SecurityError):
+            validator.validate_file_path(path)
+    
+    @pytest.mark.skipif(os.name == 'nt', reason="':' is not allowed in Windows file names")
+    def test_drive_like_file_name_allowed(self, monkeypatch, tmp_path):
+        """Test that a POSIX file name with a drive-like prefix is not treated as absolute."""
+        (tmp_path / "a:b.py").write_text("x = 1\n")
+        monkeypatch.chdir(tmp_path)
         
-        for path in dangerous_paths:
-            with pytest.raises(SecurityError):
-                validator.validate_file_path(path)
+        assert validator.validate_file_path("a:b.py").name == "a:b.py"
     
-    def test_suspicious_code_detection(self):
+    @pytest.mark.parametrize("code", [
+        "eval('print(1)')",
+        "exec('import os')",
+        "__import__('os')",
+        "os.system('rm -rf /')",
+        "subprocess.call(['rm', '-rf', '/'])",
+        "input('Enter password:')"
+    ])
+    def test_suspicious_code_detection(self, code):
         """Test detection of suspicious code patterns."""
-        suspicious_patterns = [
-            "eval('print(1)')",
-            "exec('import os')",
-            "__import__('os')",
-            "os.system('rm -rf /')",
-            "subprocess.call(['rm', '-rf', '/'])",
-            "input('Enter password:')"
-        ]
-        
-        for code in suspicious_patterns:
-            with pytest.raises(SecurityError):
-                validator.validate_file_content(code, "test.py")
+        with pytest.raises(SecurityError):
+            validator.validate_file_content(code, "test.py")
     
     def test_api_key_masking(self):
         """Test API key masking for security."""
@@ -245,20 +236,27 @@ class TestSecurityFeatures:
 class TestPerformanceFeatures:
     """Test performance and resource management."""
     
-    def test_file_size_limits(self):
+    def test_file_size_limits(self, monkeypatch, tmp_path):
         """Test file size limits."""
-        # Create a large file
-        large_file = tempfile.NamedTemporaryFile(mode='w', delete=False)
-        large_content = "print('test')\n" * 100000  # ~1.8MB
-        large_file.write(large_content)
-        large_file.close()
+        # Lower the limit rather than writing more than the real 50 MB default
+        monkeypatch.setattr(validator, 'max_file_size', 1024)
+        small_file = tmp_path / "small.py"
+        small_file.write_bytes(b"x" * 1024)
+        large_file = tmp_path / "large.py"
+        large_file.write_bytes(b"x" * 1025)
+        
+        assert validator.validate_file_size(small_file) == 1024
         
-        try:
-            # Should raise error for large content
-            with pytest.raises(ValidationError):
-                validator.validate_file_content(large_content, "test.py")
-        finally:
-            os.unlink(large_file.name)
+        # Should raise error for large files, judged by size on disk
+        with pytest.raises(ValidationError, match="too large"):
+            validator.validate_file_size(large_file)
+    
+    def test_line_count_limits(self):
+        """Test line count limits."""
+        # Newlines only: no long lines or suspicious patterns to trip first
+        too_many_lines = "\n" * validator.MAX_LINES_PER_FILE
+        with pytest.raises(ValidationError, match="Too many lines"):
+            validator.validate_file_content(too_many_lines, "test.py")
     
     def test_line_length_limits(self):
         """Test line length limits."""
@@ -289,7 +287,7 @@ class TestConfigurationManagement:
             assert test_config.llm.temperature == 0.5
             assert test_config.analysis.max_file_size_mb == 20
     
-    def test_config_file_loading(self):
+    def test_config_file_loading(self, tmp_path):
         """Test configuration file loading."""
         config_data = {
             'llm': {
@@ -301,17 +299,13 @@ class TestConfigurationManagement:
             }
         }
         
-        config_file = tempfile.NamedTemporaryFile(mode='w', delete=False)
-        json.dump(config_data, config_file)
-        config_file.close()
+        config_file = tmp_path / "config.json"
+        config_file.write_text(json.dumps(config_data))
         
-        try:
-            test_config = Config(config_file.name)
-            assert test_config.llm.model == 'test-model'
-            assert test_config.llm.temperature == 0.3
-            assert test_config.analysis.chunk_size == 1000
-        finally:
-            os.unlink(config_file.name)
+        test_config = Config(str(config_file))
+        assert test_config.llm.model == 'test-model'
+        assert test_config.llm.temperature == 0.3
+        assert test_config.analysis.chunk_size == 1000
     
     def test_config_validation(self):
         """Test configuration validation."""
@@ -331,16 +325,7 @@ class TestConfigurationManagement:
 class TestOutputGeneration:
     """Test output generation and formatting."""
     
-    def setup_method(self):
-        """Setup test environment."""
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def teardown_method(self):
-        """Cleanup test environment."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
-    def test_report_generation(self):
+    def test_report_generation(self, tmp_path):
         """Test report generation."""
         test_content = "print('Hello, World!')"
         improved_content = "print('Hello, World!')  # Simple greeting"
@@ -348,31 +333,26 @@ class TestOutputGeneration:
         metrics = {'complexity_score': 5}
         
         # Test markdown report
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-            report_path = f.name
+        report_path = str(tmp_path / "report.md")
+        generate_report(
+            test_content,
+            improved_content,
+            issues,
+            report_path,
+            'test.py',
+            metrics
+        )
         
-        try:
-            generate_report(
-                test_content,
-                improved_content,
-                issues,
-                report_path,
-                'test.py',
-                metrics
-            )
-            
-            # Verify report was created
-            assert os.path.exists(report_path)
-            with open(report_path, 'r') as f:
-                content = f.read()
-                assert 'test.py' in content
-                assert 'readability' in content
-        finally:
-            os.unlink(report_path)
+        # Verify report was created
+        assert os.path.exists(report_path)
+        with open(report_path, 'r') as f:
+            content = f.read()
+            assert 'test.py' in content
+            assert 'readability' in content
     
-    def test_output_directory_creation(self):
+    def test_output_directory_creation(self, tmp_path):
         """Test output directory creation."""
-        output_dir = os.path.join(self.temp_dir, "output")
+        output_dir = os.path.join(tmp_path, "output")
         
         # Should create directory if it doesn't exist
         if not os.path.exists(output_dir):
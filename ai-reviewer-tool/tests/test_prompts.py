@@ -10,6 +10,7 @@ from src.prompts import (
     get_performance_analysis_prompt,
     get_documentation_prompt,
     get_summary_prompt,
+    build_summary_prompt_to,
     _format_requirements,
     _format_issues
 )
@@ -157,6 +158,18 @@ class TestPrompts:
         assert 'technical analysis' in prompt.lower()
         assert 'Python' in prompt
     
+    def test_build_summary_prompt_to_stream(self):
+        """Test that streaming the summary prompt matches get_summary_prompt."""
+        import io
+        analysis_results = [{'file_path': 'a.py', 'issues': []}]
+        project_structure = {'languages': ['Python']}
+        
+        buffer = io.StringIO()
+        build_summary_prompt_to(buffer, analysis_results, project_structure)
+        
+        assert buffer.getvalue() == get_summary_prompt(analysis_results, project_structure)
+        assert '"file_path": "a.py"' in buffer.getvalue()
+    
     def test_format_requirements(self):
         """Test formatting requirements dictionary."""
         requirements = {
@@ -280,6 +293,192 @@ class TestPrompts:
         assert 'improved_code' in prompt.lower()
         assert 'metrics' in prompt.lower()
 
+    
+    def test_compiled_templates_built_once(self):
+        """Test that compiled legacy templates are built once and reused in-process."""
+        from src.prompts import prompts as prompts_module
+        
+        template = prompts_module._get_compiled_template('code_review')
+        assert prompts_module._get_compiled_template('code_review') is template
+        assert prompts_module._compiled_templates.keys() == prompts_module._TEMPLATE_SPECS.keys()
+
+    
+    def test_registry_reloads_changed_override_file(self, tmp_path):
+        """Test that file overrides are re-read only when their mtime changes."""
+        import os
+        from src.prompts import PromptRegistry
+        
+        override = tmp_path / 'greeting.txt'
+        override.write_text('Hello {who}', encoding='utf-8')
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        assert registry.get('greeting', who='a') == 'Hello a'
+        
+        override.write_text('Bye {who}', encoding='utf-8')
+        stat = override.stat()
+        os.utime(override, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert registry.get('greeting', who='a') == 'Bye a'
+
+    
+    def test_registry_get_matches_str_format(self, tmp_path):
+        """Test that precompiled rendering matches str.format and still raises KeyError."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        variables = {'code': 'x = 1', 'file_path': 'a.py', 'language': 'python'}
+        template = registry.get_prompt_template('security_analysis', list(variables)).template
+        
+        assert registry.get('security_analysis', **variables) == template.format(**variables)
+        with pytest.raises(KeyError):
+            registry.get('security_analysis', code='x = 1')
+
+    
+    def test_registry_get_uses_re_registered_template(self, tmp_path):
+        """Test that re-registering a template changes what get() renders."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        registry.register('custom', 'Review {code}')
+        assert registry.get('custom', code='a') == 'Review a'
+        
+        registry.register('custom', 'Audit {code}')
+        assert registry.get('custom', code='a') == 'Audit a'
+        assert registry.get('custom', code=['a']) == "Audit ['a']"
+
+
+    def test_registry_get_source_returns_unformatted_template(self, tmp_path):
+        """Test that get_source() returns template text without rendering it."""
+        from src.prompts import PromptRegistry
+
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        registry.register('custom', 'Review {code}')
+        assert registry.get_source('custom') == 'Review {code}'
+        assert '{code}' in registry.get_source('security_analysis')
+        assert registry.get_source('missing') is None
+
+    
+    def test_registry_defaults_loaded_lazily(self, tmp_path):
+        """Test that default templates are only built when first requested."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        assert 'agent_reviewer_backstory' not in registry.templates
+        assert 'agent_reviewer_backstory' in registry.list_templates()
+        
+        assert 'senior software engineer' in registry.get('agent_reviewer_backstory')
+        assert 'agent_reviewer_backstory' in registry.templates
+
+    
+    def test_registry_reuses_prompt_template_objects(self, tmp_path):
+        """Test that PromptTemplate objects are cached per (name, input_variables)."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        variables = ['code', 'file_path', 'language']
+        first = registry.get_prompt_template('code_analysis', variables)
+        assert registry.get_prompt_template('code_analysis', variables) is first
+        
+        registry.register('code_analysis', 'Analyze {code} in {file_path} ({language})')
+        replaced = registry.get_prompt_template('code_analysis', variables)
+        assert replaced is not first
+        assert replaced.template.startswith('Analyze')
+
+
+    def test_registry_prompt_template_variable_mismatch(self, tmp_path, caplog):
+        """Test that declared variables are kept and a mismatching override still works."""
+        from src.prompts import PromptRegistry
+
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        variables = ('language', 'file_path', 'code')
+        prompt_template = registry.get_prompt_template('code_analysis', variables)
+        assert prompt_template.input_variables == list(variables)
+
+        # An override without {language} warns but keeps formatting
+        registry.register('code_analysis', 'Analyze {code} in {file_path}')
+        prompt_template = registry.get_prompt_template('code_analysis', variables)
+        assert prompt_template.input_variables == ['code', 'file_path']
+        assert 'caller declared' in caplog.text
+        assert prompt_template.template.format(code='x', file_path='a.py', language='python') == 'Analyze x in a.py'
+
+
+    def test_registry_cold_lookups_from_threads(self, tmp_path):
+        """Test that concurrent first lookups on a cold registry don't race."""
+        from concurrent.futures import ThreadPoolExecutor
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        variables = ('code', 'file_path', 'language')
+        names = ['code_analysis', 'security_analysis', 'performance_analysis'] * 20
+        
+        def lookup(name):
+            registry.register('custom', 'Review {code}')
+            return registry.get_prompt_template(name, variables).template
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            templates = list(executor.map(lookup, names))
+        assert templates[:3] == [registry.templates[name] for name in names[:3]]
+
+    
+    def test_registry_validate_templates(self, tmp_path):
+        """Test template validation using each template's own fields."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        assert registry.validate_templates() is True
+        
+        registry.register('broken', 'Unclosed {code')
+        assert registry.validate_templates(['broken']) is False
+        assert registry.validate_templates(['missing_template']) is False
+
+    
+    def test_registry_get_non_strict_keeps_placeholders(self, tmp_path):
+        """Test that non-strict rendering leaves missing fields in place."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        registry.register('custom', 'Review {code} in {language}')
+        
+        assert registry.get('custom', _strict=False, code='x') == 'Review x in {language}'
+        with pytest.raises(KeyError):
+            registry.get('custom', code='x')
+        
+        # A field called 'strict' is an ordinary template argument
+        registry.register('flags', 'Mode: {strict}')
+        assert registry.get('flags', strict='on') == 'Mode: on'
+
+    
+    def test_registry_partial_specialization(self, tmp_path):
+        """Test baking a constant field into a template."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path))
+        specialized = registry.partial('code_analysis', language='python')
+        
+        assert registry.partial('code_analysis', language='python') == specialized
+        assert '{language}' not in registry.templates[specialized]
+        
+        variables = {'code': 'x = 1', 'file_path': 'a.py'}
+        expected = registry.get('code_analysis', language='python', **variables)
+        assert registry.get(specialized, **variables) == expected
+
+        # Unhashable values are accepted too
+        with_issues = registry.partial('code_improvement', issues=['unused import'])
+        assert registry.partial('code_improvement', issues=['unused import']) == with_issues
+        assert "['unused import']" in registry.templates[with_issues]
+
+    
+    def test_registry_save_templates_round_trip(self, tmp_path):
+        """Test that saved templates load back unchanged."""
+        from src.prompts import PromptRegistry
+        
+        registry = PromptRegistry(config_dir=str(tmp_path / 'missing'))
+        registry.register('unicode', 'Überprüfe {code} ✓')
+        registry.save_templates(str(tmp_path / 'prompts.json'))
+        
+        reloaded = PromptRegistry(config_dir=str(tmp_path))
+        assert reloaded.get('unicode', code='x') == 'Überprüfe x ✓'
+        assert reloaded.get_prompt_template('code_review', ['reqs', 'code', 'file_path']).template == \
+            registry.get_prompt_template('code_review', ['reqs', 'code', 'file_path']).template
+
 
 if __name__ == '__main__':
     pytest.main([__file__]) 
\ No newline at end of file
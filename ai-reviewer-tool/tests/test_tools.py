@@ -1,6 +1,27 @@
 import os
+import threading
+import time
+from unittest.mock import patch
 import pytest
-from src.tools import analyze_code, improve_code, chunk_code
+from src.tools import (
+    analyze_code,
+    improve_code,
+    chunk_code,
+    analyze_all,
+    analyze_code_with_chunking,
+    analyze_security,
+    get_llm_provider,
+    _fallback_analysis,
+    _chunk_line_ranges,
+    _analyze_single_chunk,
+    _fallback_security_analysis,
+    _fallback_performance_analysis,
+    _parse_security_plain_text_response,
+    _fallback_improve_code,
+    _SECURITY_PATTERNS,
+    _PERFORMANCE_PATTERNS,
+    _SYNTAX_PATTERNS,
+)
 
 
 def test_analyze_code_basic():
@@ -63,4 +84,204 @@ def test_chunk_code_empty():
     chunks = chunk_code("", max_tokens=10, overlap=2)
     assert isinstance(chunks, list)
     assert len(chunks) == 1
-    assert chunks[0] == "" 
\ No newline at end of file
+    assert chunks[0] == "" 
+
+
+def test_fallback_analysis_reports_each_matching_pattern():
+    code = "import subprocess\nsubprocess.call(cmd, shell=True)\nfor i in range(len(xs)):\n    print(xs[i])\n"
+    descriptions = [i['description'] for i in _fallback_analysis(code, "x.py")['issues']]
+    # Overlapping patterns on the same text must all still be reported
+    assert 'Command injection vulnerability' in descriptions
+    assert 'Subprocess usage - potential security risk' in descriptions
+    assert 'Shell injection risk' in descriptions
+    assert 'Use enumerate instead' in descriptions
+    assert 'Consider using logging instead of print' in descriptions
+
+
+def test_analyze_all_runs_selected_analyses():
+    code = "def add(a, b):\n    return a + b\n"
+    results = analyze_all(code, "test.py", security=True, performance=False)
+    assert 'issues' in results['analysis']
+    assert 'security_issues' in results['security']
+    assert results['performance'] is None
+
+
+def test_chunked_analysis_reports_file_line_numbers():
+
+    class FakeLLM:
+        def invoke(self, prompt):
+            return '{"issues": [{"type": "bug", "description": "x", "line": 1}], "metrics": {}}'
+
+    code = "\n".join("x = '%s'" % ("a" * 200) for _ in range(40))
+    ranges = _chunk_line_ranges(code.split('\n'), max_tokens=800, overlap=100)
+    assert len(ranges) > 1
+
+    result = analyze_code_with_chunking(code, "big.py", FakeLLM())
+    lines = [i['line'] for i in result['issues'] if i['type'] == 'bug']
+    assert lines == [start + 1 for start, _ in ranges]
+
+
+def test_analysis_parses_json_followed_by_braces_in_prose():
+
+    class FakeLLM:
+        def invoke(self, prompt):
+            return ('Result: {"issues": [{"type": "bug", "description": "uses \\"}\\"", "line": 3}],'
+                    ' "summary": "ok"}\nNote: wrap blocks in {} when needed.')
+
+    result = _analyze_single_chunk("x = 1\n", "a.py", FakeLLM())
+    assert result['analysis_type'] == 'llm_analysis'
+    assert result['issues'][0]['line'] == 3
+
+
+def test_analysis_results_are_cached_by_content(monkeypatch):
+    monkeypatch.setenv('CACHE_ENABLED', 'true')
+    calls = []
+
+    class FakeLLM:
+        def invoke(self, prompt):
+            calls.append(prompt)
+            return '{"security_issues": [], "overall_security_score": 9}'
+
+    with patch('src.tools.get_llm_provider', return_value=FakeLLM()):
+        first = analyze_security.invoke({"code": "x = 1\n", "file_path": "a.py"})
+        second = analyze_security.invoke({"code": "x = 1\n", "file_path": "a.py"})
+        analyze_security.invoke({"code": "x = 2\n", "file_path": "a.py"})
+
+    assert first == second
+    assert first['overall_security_score'] == 9
+    assert len(calls) == 2
+
+
+def test_fallback_provider_results_are_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setenv('CACHE_ENABLED', 'true')
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path))
+
+    class FallbackLLM:
+        current_provider = "fallback"
+
+        def invoke(self, prompt):
+            return "Fallback security analysis: Checking for common security patterns."
+
+    with patch('src.tools.get_llm_provider', return_value=FallbackLLM()):
+        analyze_security.invoke({"code": "x = 1\n", "file_path": "a.py"})
+
+    assert not (tmp_path / 'analysis').exists()
+
+
+def test_analysis_cache_is_keyed_by_provider(monkeypatch):
+    monkeypatch.setenv('CACHE_ENABLED', 'true')
+    calls = []
+
+    class FakeLLM:
+        def __init__(self, provider):
+            self.current_provider = provider
+
+        def invoke(self, prompt):
+            calls.append(self.current_provider)
+            return '{"security_issues": [], "overall_security_score": 9}'
+
+    for provider in ("groq_a", "openai_b"):
+        with patch('src.tools.get_llm_provider', return_value=FakeLLM(provider)):
+            analyze_security.invoke({"code": "x = 1\n", "file_path": "a.py"})
+
+    assert calls == ["groq_a", "openai_b"]
+
+
+def test_fallback_security_and_performance_share_compiled_patterns():
+    code = "subprocess_call(x)\nresult = eval(data)\nfor i in range(len(xs)):\n    pass\n"
+    security = [i['description'] for i in _fallback_security_analysis(code, "a.py")['security_issues']]
+    assert 'Code injection vulnerability' in security
+    # '.' in subprocess.call is literal, not a wildcard
+    assert 'Command injection vulnerability' not in security
+    performance = [i['description'] for i in _fallback_performance_analysis(code, "a.py")['performance_issues']]
+    assert performance == ['Use enumerate instead']
+
+
+def test_fallback_analysis_reports_match_line_numbers():
+    code = "x = 1\n\nresult = eval(data)\n"
+    issues = _fallback_security_analysis(code, "a.py")['security_issues']
+    assert [(i['description'], i['line']) for i in issues] == [('Code injection vulnerability', 3)]
+
+
+def test_fallback_patterns_do_not_backtrack_catastrophically():
+    # One 280k-character line; a quadratic pattern takes minutes on this
+    start = time.perf_counter()
+    result = _fallback_performance_analysis("for in .append(" * 20000, "a.py")
+    security = _fallback_security_analysis("open(" * 50000, "a.py")
+    assert time.perf_counter() - start < 1
+    descriptions = [i['description'] for i in result['performance_issues']]
+    assert 'Nested loops may be inefficient' not in descriptions
+    assert 'Use enumerate instead' not in descriptions
+    assert 'Consider list comprehension' not in descriptions
+    assert security['security_issues'] == []
+
+
+def test_fallback_keyword_sequences_stay_on_one_line():
+    code = "for x in items:\n    print(range(len(x)))\nfor i in range(len(xs)): pass\n"
+    issues = _fallback_performance_analysis(code, "a.py")['performance_issues']
+    assert [(i['description'], i['line']) for i in issues] == [('Use enumerate instead', 3)]
+
+
+def test_security_plain_text_response_pairs_issues_with_mitigations():
+    text = "Mitigation: ignored\nSQL injection in query\n  mitigation: use parameters\nnotes\nXSS in template\n"
+    issues = _parse_security_plain_text_response(text, "a.py")['security_issues']
+    assert [(i['description'], i['mitigation']) for i in issues] == [
+        ('SQL injection in query', 'use parameters'),
+        ('XSS in template', ''),
+    ]
+
+
+def test_fallback_improve_code_applies_each_fix_once():
+    issues = [
+        {'type': 'maintainability', 'description': 'Bare except clause'},
+        {'type': 'maintainability', 'description': 'Bare except clause'},
+        {'type': 'performance', 'description': 'Nested loops detected'},
+    ]
+    improved = _fallback_improve_code("try:\n    x()\nexcept:\n    pass", issues, "a.py")['improved_code']
+    assert improved == "# PERFORMANCE: Consider optimizing nested loops\ntry:\n    x()\nexcept Exception:\n    pass"
+
+
+def test_fallback_patterns_still_match_any_case():
+    issues = _fallback_security_analysis("run(cmd, Shell=TRUE)\n", "a.py")['security_issues']
+    assert [i['description'] for i in issues] == ['Shell injection risk']
+
+
+def test_fallback_scan_patterns_are_lowercase():
+    for pattern, _ in _SECURITY_PATTERNS + _PERFORMANCE_PATTERNS + _SYNTAX_PATTERNS:
+        assert pattern == pattern.lower()
+
+
+def test_fallback_literal_patterns_report_line_numbers():
+    result = _fallback_analysis("x = 1\ntry:\n    pass\nexcept:\n    pass\n", "a.py")
+    lines = {i['description']: i['line'] for i in result['issues']}
+    assert lines['Bare except clause - specify exception type'] == 4
+
+
+def test_concurrent_first_calls_build_one_llm_provider():
+    calls = []
+    started = threading.Barrier(3)
+
+    class FakeProvider:
+        def get_provider_info(self):
+            return {'provider': 'fake'}
+
+    def slow_create(config):
+        calls.append(config)
+        time.sleep(0.05)
+        return FakeProvider()
+
+    def worker(results):
+        started.wait()
+        results.append(get_llm_provider('concurrency-test-model'))
+
+    results = []
+    with patch('src.tools.create_llm_provider', side_effect=slow_create):
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(calls) == 1
+    assert len({id(provider) for provider in results}) == 1
+